@@ -12,6 +12,13 @@ router.register(r'sessions', api_views.ReadingSessionViewSet, basename='session'
 
 urlpatterns = [
     path('auth/token/', obtain_auth_token, name='api_obtain_auth_token'),
+    path('auth/signed-token/', api_views.obtain_signed_token, name='api_obtain_signed_token'),
     path('', api_views.api_usage_guide, name='api_usage_guide'),
+    path('stats/', api_views.reading_stats, name='api_reading_stats'),
+    path('books/import/', api_views.import_books, name='api_import_books'),
+    path('export/', api_views.export_library, name='api_export_library'),
+    path('sync/', api_views.sync_changes, name='api_sync_changes'),
+    path('cache/', api_views.cache_stats, name='api_cache_stats'),
+    path('sessions/bulk/', api_views.bulk_import_sessions, name='api_bulk_import_sessions'),
     path('', include(router.urls)),
 ]
@@ -1,10 +1,29 @@
-from django.http import JsonResponse
+import csv
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import status, viewsets
-from rest_framework.decorators import action
+from rest_framework.authtoken.serializers import AuthTokenSerializer
+from rest_framework.decorators import action, api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 
+from . import authentication, cache as user_cache, conditional, deletion, export, importer, stats, sync
+from .conditional import conditional_get
 from .models import Book, Category, ReadingSession
-from .serializers import BookSerializer, CategorySerializer, ReadingSessionSerializer, refresh_book_status
+from .pagination import BookPagination, ReadingSessionPagination
+from .search import search_books
+from .serializers import (
+    BookCompactSerializer,
+    BookSerializer,
+    BulkReadingSessionSerializer,
+    CategorySerializer,
+    ReadingSessionSerializer,
+)
 
 
 def api_usage_guide(request):
@@ -32,11 +51,21 @@ def api_usage_guide(request):
                     'cuerpo_json_ejemplo': {'username': 'tu_usuario', 'password': 'tu_contraseña'},
                 },
             },
+            'token_firmado': (
+                'Opcional (si el servidor activa BOOKS_SIGNED_TOKENS): POST a '
+                + abs_url('auth/signed-token/')
+                + ' con username y password devuelve un token que caduca; envíalo como '
+                'Authorization: Bearer <token>.'
+            ),
             'alternativas': [
                 'Sesión (cookies) si ya iniciaste sesión en el navegador.',
                 'Basic Auth (Authorization: Basic …) con usuario y contraseña.',
             ],
         },
+        'cache_http': (
+            'GET de libros, sesiones y categorías devuelve ETag (y Last-Modified en detalles). '
+            'Reenvía el ETag en If-None-Match: si nada cambió la respuesta es 304 sin cuerpo.'
+        ),
         'cors': (
             'Si llamas desde un navegador en otro dominio, configura CORS_ALLOWED_ORIGINS '
             'o CORS_ALLOW_ALL_ORIGINS en el servidor (ver settings).'
@@ -53,7 +82,16 @@ def api_usage_guide(request):
                 'nombre': 'Libros (del usuario autenticado)',
                 'url': abs_url('books/'),
                 'metodos': ['GET', 'POST'],
-                'query': {'status': 'PENDING | READING | COMPLETED', 'q': 'búsqueda en título o autor'},
+                'query': {
+                    'status': 'PENDING | READING | COMPLETED',
+                    'q': 'búsqueda en título o autor (sin distinguir acentos; ordena por relevancia)',
+                    'page_size': 'resultados por página (máx. 200, por defecto 50)',
+                    'cursor': 'valor opaco tomado del enlace "next" de la respuesta',
+                    'fields': 'solo estos campos, separados por comas (p. ej. id,title,status)',
+                    'omit': 'todos los campos salvo estos (p. ej. cover_url,total_time_read)',
+                    'compact': '1 para la representación ligera: id, title, status, updated_at',
+                },
+                'respuesta': {'next': 'URL de la página siguiente o null', 'results': '[…]'},
                 'crear_json_ejemplo': {
                     'title': 'Título',
                     'author': 'Autor',
@@ -65,10 +103,18 @@ def api_usage_guide(request):
                 'detalle': abs_url('books/{id}/'),
                 'detalle_metodos': ['GET', 'PUT', 'PATCH', 'DELETE'],
             },
+            {
+                'nombre': 'Borrado masivo de libros (con sus sesiones)',
+                'url': abs_url('books/bulk-delete/'),
+                'metodos': ['POST'],
+                'crear_json_ejemplo': {'ids': [1, 2, 3]},
+                'respuesta': 'libros y sesiones borrados',
+            },
             {
                 'nombre': 'Sesiones de lectura de un libro',
                 'url': abs_url('books/{id}/sessions/'),
                 'metodos': ['GET', 'POST'],
+                'query': {'page_size': 'máx. 200, por defecto 50', 'cursor': 'del enlace "next"'},
                 'crear_json_ejemplo': {
                     'end_page': 120,
                     'duration_minutes': '30',
@@ -76,6 +122,54 @@ def api_usage_guide(request):
                     'notes': '',
                 },
             },
+            {
+                'nombre': 'Estadísticas de lectura (minutos por periodo y libros por estado)',
+                'url': abs_url('stats/'),
+                'metodos': ['GET'],
+            },
+            {
+                'nombre': 'Importación masiva de sesiones (varios libros, una transacción)',
+                'url': abs_url('sessions/bulk/'),
+                'metodos': ['POST'],
+                'crear_json_ejemplo': {
+                    'sessions': [
+                        {'book': 1, 'end_page': 40, 'duration_minutes': '25', 'date': '2026-04-14'},
+                        {'book': 2, 'end_page': 12, 'duration_minutes': '10', 'date': '2026-04-15'},
+                    ],
+                },
+            },
+            {
+                'nombre': 'Importación de libros desde CSV (exportación propia o de Goodreads)',
+                'url': abs_url('books/import/'),
+                'metodos': ['POST'],
+                'cuerpo': 'multipart/form-data con el archivo en el campo "file"',
+                'columnas': 'title, author, total_pages, status, category, cover_url '
+                            '(o Title, Author, Number of Pages, Exclusive Shelf de Goodreads)',
+                'respuesta': 'filas, creados, duplicados, errores por línea y filas por segundo',
+            },
+            {
+                'nombre': 'Exportación completa (libros y sesiones, en streaming)',
+                'url': abs_url('export/'),
+                'metodos': ['GET'],
+                'query': {
+                    'fmt': 'csv | ndjson (por defecto csv)',
+                    'resource': 'books | sessions; en ndjson se omite para exportar ambos',
+                },
+            },
+            {
+                'nombre': 'Sincronización incremental (clientes sin conexión)',
+                'url': abs_url('sync/'),
+                'metodos': ['GET'],
+                'query': {
+                    'since': 'el "token" de la respuesta anterior; sin él, la biblioteca completa',
+                    'page_size': 'filas (o ids borrados) de cada tipo por página (por defecto 500, máx. 2000)',
+                },
+                'respuesta': (
+                    'books, sessions y categories cambiados desde el token, deleted con los ids borrados '
+                    '(borrar un libro borra sus sesiones) y un token nuevo, por páginas: '
+                    'sigue "next" hasta que sea null y guarda el token. Con 410, repite sin "since".'
+                ),
+            },
             {
                 'nombre': 'Sesión (por id)',
                 'url': abs_url('sessions/{id}/'),
@@ -97,43 +191,241 @@ def api_usage_guide(request):
     return JsonResponse(payload, json_dumps_params={'ensure_ascii': False, 'indent': 2})
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def obtain_signed_token(request):
+    """POST /api/auth/signed-token/ — token firmado y con caducidad (si BOOKS_SIGNED_TOKENS está activo)."""
+    if not settings.BOOKS_SIGNED_TOKENS:
+        raise Http404
+    serializer = AuthTokenSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    user = serializer.validated_data['user']
+    return Response({
+        'token': authentication.make_signed_token(user),
+        'expires_at': timezone.now() + timedelta(seconds=settings.BOOKS_SIGNED_TOKEN_MAX_AGE),
+    })
+
+
+@api_view(['GET'])
+def reading_stats(request):
+    """GET /api/stats/ — minutos por periodo y contadores por estado (2 consultas)."""
+    ranges = stats.period_ranges()
+    minutes = stats.minutes_by_period(request.user, ranges)
+    return Response({
+        'periods': {
+            name: {'start': start, 'end': end, 'minutes': str(minutes[name])}
+            for name, (start, end) in ranges.items()
+        },
+        'books': stats.status_counts(request.user),
+    })
+
+
+@api_view(['POST'])
+def bulk_import_sessions(request):
+    """POST /api/sessions/bulk/ — importa muchas sesiones (de varios libros) en una transacción."""
+    data = request.data.get('sessions') if isinstance(request.data, dict) else request.data
+    if not isinstance(data, list):
+        return Response(
+            {'sessions': ['Envía una lista de sesiones o {"sessions": [...]}.']},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    serializer = BulkReadingSessionSerializer(
+        data=data,
+        many=True,
+        allow_empty=False,
+        max_length=settings.BOOKS_BULK_SESSIONS_MAX,
+        context={'request': request},
+    )
+    serializer.is_valid(raise_exception=True)
+    sessions = serializer.save()
+    books = Book.objects.filter(pk__in={s.book_id for s in sessions}).order_by('pk')
+    return Response(
+        {
+            'created': len(sessions),
+            'books': [
+                {'id': b.pk, 'status': b.status, 'pages_read': b.pages_read} for b in books
+            ],
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def import_books(request):
+    """POST /api/books/import/ — importa libros desde un CSV (exportación propia o de Goodreads)."""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'file': ['Adjunta el CSV en el campo "file".']}, status=status.HTTP_400_BAD_REQUEST)
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        report = importer.import_books(request.user, lines)
+    except UnicodeDecodeError:
+        return Response({'file': ['El archivo debe estar en UTF-8.']}, status=status.HTTP_400_BAD_REQUEST)
+    except csv.Error as exc:
+        return Response({'file': [f'El CSV no es válido: {exc}.']}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def export_library(request):
+    """GET /api/export/ — libros y/o sesiones del usuario en CSV o NDJSON, en streaming."""
+    # "fmt", not "format": DRF reserves ?format= for renderer negotiation.
+    fmt = request.query_params.get('fmt', 'csv')
+    resource = request.query_params.get('resource')
+    if fmt not in ('csv', 'ndjson'):
+        return Response({'fmt': ['Usa csv o ndjson.']}, status=status.HTTP_400_BAD_REQUEST)
+    if resource is not None and resource not in export.RESOURCES:
+        return Response({'resource': ['Usa books o sessions.']}, status=status.HTTP_400_BAD_REQUEST)
+
+    stamp = timezone.localdate().strftime('%Y%m%d')
+    if fmt == 'csv':
+        resource = resource or 'sessions'
+        response = StreamingHttpResponse(
+            export.stream_csv(request.user, resource), content_type='text/csv; charset=utf-8'
+        )
+    else:
+        resources = [resource] if resource else list(export.RESOURCES)
+        resource = resource or 'library'
+        response = StreamingHttpResponse(
+            export.stream_ndjson(request.user, resources), content_type='application/x-ndjson; charset=utf-8'
+        )
+    response['Content-Disposition'] = f'attachment; filename="booktracker-{resource}-{stamp}.{fmt}"'
+    return response
+
+
+@api_view(['GET'])
+def sync_changes(request):
+    """GET /api/sync/ — cambios (y borrados) desde el token de la sincronización anterior."""
+    # since: token of the previous sync; started: token of the first page of this one.
+    moments = {}
+    for param in ('since', 'started'):
+        token = request.query_params.get(param)
+        if not token:
+            continue
+        try:
+            moments[param] = sync.decode_token(token)
+        except sync.TokenExpired:
+            return Response(
+                {param: ['Token caducado: sincroniza de nuevo sin "since".']}, status=status.HTTP_410_GONE
+            )
+        except ValueError:
+            return Response({param: ['Token inválido.']}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(sync.changes(request, **moments))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """GET /api/cache/ — aciertos y fallos de la caché por usuario (este proceso)."""
+    return Response(user_cache.stats())
+
+
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
 
+    @conditional_get(etag_func=conditional.category_list_etag)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(last_modified_func=conditional.category_last_modified)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+def book_serializer_class(query_params):
+    return BookCompactSerializer if query_params.get('compact') in ('1', 'true') else BookSerializer
+
+
+def book_queryset(user, query_params, serializer_class=None):
+    """Books of ``user`` filtered by the ?status= and ?q= parameters.
+
+    With ``serializer_class``, only the columns its picked fields read are loaded.
+    """
+    qs = (
+        Book.objects.filter(user=user)
+        .select_related('category')
+        .order_by('category__name', '-updated_at')
+    )
+    status_filter = query_params.get('status')
+    if status_filter:
+        qs = qs.filter(status=status_filter)
+    q = query_params.get('q', '').strip()
+    if q:
+        qs = search_books(qs, q)
+    if serializer_class is not None:
+        # The keyset cursor reads the ordering values of the last row.
+        keep = [field.lstrip('-') for field in BookPagination.ordering]
+        qs = serializer_class.trim_queryset(qs, query_params, keep)
+    return qs
+
 
 class BookViewSet(viewsets.ModelViewSet):
     serializer_class = BookSerializer
+    pagination_class = BookPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return book_serializer_class(self.request.query_params)
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        qs = (
-            Book.objects.filter(user=self.request.user)
-            .select_related('category')
-            .order_by('category__name', '-updated_at')
+        # Writes save the instance, so they need every column.
+        trim = self.action in ('list', 'retrieve')
+        return book_queryset(
+            self.request.user, self.request.query_params, self.get_serializer_class() if trim else None
         )
-        status_filter = self.request.query_params.get('status')
-        if status_filter:
-            qs = qs.filter(status=status_filter)
-        q = self.request.query_params.get('q', '').strip()
-        if q:
-            from django.db.models import Q
 
-            qs = qs.filter(Q(title__icontains=q) | Q(author__icontains=q))
-        return qs
+    @conditional_get(etag_func=conditional.book_list_etag)
+    def list(self, request, *args, **kwargs):
+        data = user_cache.get_or_build(
+            request.user.pk,
+            ('api_books', request.get_full_path()),
+            lambda: super(BookViewSet, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+    @conditional_get(etag_func=conditional.book_etag, last_modified_func=conditional.book_last_modified)
+    def retrieve(self, request, *args, **kwargs):
+        data = user_cache.get_or_build(
+            request.user.pk,
+            ('api_book', request.get_full_path()),
+            lambda: super(BookViewSet, self).retrieve(request, *args, **kwargs).data,
+        )
+        return Response(data)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        deletion.delete_books(Book.objects.filter(pk=instance.pk))
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """POST /api/books/bulk-delete/ — borra varios libros (y sus sesiones) de una vez."""
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return Response({'ids': ['Envía una lista de ids de libros.']}, status=status.HTTP_400_BAD_REQUEST)
+        counts = deletion.delete_books(Book.objects.filter(user=request.user, pk__in=ids))
+        return Response(counts)
+
     @action(detail=True, methods=['get', 'post'])
+    @conditional_get(etag_func=conditional.book_etag, last_modified_func=conditional.book_last_modified)
     def sessions(self, request, pk=None):
-        book = self.get_object()
         if request.method == 'GET':
-            sessions = book.readingsession_set.all().order_by('-date', '-id')
-            return Response(ReadingSessionSerializer(sessions, many=True).data)
+            def build():
+                book = self.get_object()
+                paginator = ReadingSessionPagination()
+                page = paginator.paginate_queryset(book.readingsession_set.all(), request, view=self)
+                return paginator.get_paginated_response(ReadingSessionSerializer(page, many=True).data).data
+
+            data = user_cache.get_or_build(request.user.pk, ('api_sessions', request.get_full_path()), build)
+            return Response(data)
+        book = self.get_object()
         serializer = ReadingSessionSerializer(data=request.data, context={'book': book})
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        book.refresh_from_db()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -143,8 +435,3 @@ class ReadingSessionViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         return ReadingSession.objects.filter(book__user=self.request.user).select_related('book')
-
-    def perform_destroy(self, instance):
-        book = instance.book
-        super().perform_destroy(instance)
-        refresh_book_status(book)
@@ -1,6 +1,29 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
 
 
 class BooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'books'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.authtoken.models import Token
+
+        from .authentication import evict_token, evict_user
+        from .search import install_sqlite_fts
+
+        post_migrate.connect(install_sqlite_fts, sender=self)
+        post_delete.connect(evict_token, sender=Token)
+        post_save.connect(evict_user, sender=get_user_model())
+        post_delete.connect(evict_user, sender=get_user_model())
+
+        if settings.BOOKS_METRICS:
+            from django.db.backends.signals import connection_created
+
+            from .metrics import install_query_counter, instrument_templates
+
+            connection_created.connect(install_query_counter)
+            instrument_templates()
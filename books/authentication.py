@@ -0,0 +1,136 @@
+"""
+API authentication without a database hit per request.
+
+- CachedTokenAuthentication: DRF's TokenAuthentication with the token -> user
+  lookup kept in a small per-process LRU with a TTL. Deleting a token or
+  saving/deleting its user evicts the entry here (signals, see apps.py);
+  other worker processes see the change when their entry expires, so
+  BOOKS_AUTH_CACHE_TTL bounds how long a revoked token can still be used.
+- SignedTokenAuthentication (opt-in, BOOKS_SIGNED_TOKENS): "Bearer" tokens
+  signed with SECRET_KEY that carry the user id and expire after
+  BOOKS_SIGNED_TOKEN_MAX_AGE seconds. The signature is checked without the
+  database; the user itself comes from the same LRU. Changing the password
+  or deactivating the user invalidates them.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+SIGNED_TOKEN_SALT = 'books.authentication.signed-token'
+
+
+class _LRUCache:
+    """Thread-safe LRU with a per-entry TTL; values are (user, extra)."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + settings.BOOKS_AUTH_CACHE_TTL, value)
+            self._data.move_to_end(key)
+            while len(self._data) > settings.BOOKS_AUTH_CACHE_SIZE:
+                self._data.popitem(last=False)
+
+    def evict(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def evict_user(self, user_id):
+        with self._lock:
+            for key in [k for k, (_, (user, _)) in self._data.items() if user.pk == user_id]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_cache = _LRUCache()
+
+
+def evict_token(sender, instance, **kwargs):
+    _cache.evict(('token', instance.key))
+
+
+def evict_user(sender, instance, **kwargs):
+    _cache.evict_user(instance.pk)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = _cache.get(('token', key))
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            _cache.set(('token', key), (user, token))
+        else:
+            user, token = cached
+        # Per-request copy: views may set attributes on request.user.
+        return copy.copy(user), token
+
+
+def _signature_hash(user):
+    return user.get_session_auth_hash()[:16]
+
+
+def make_signed_token(user):
+    """A signed token for ``user``, valid for BOOKS_SIGNED_TOKEN_MAX_AGE seconds."""
+    return signing.dumps({'u': user.pk, 'h': _signature_hash(user)}, salt=SIGNED_TOKEN_SALT, compress=True)
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        if not settings.BOOKS_SIGNED_TOKENS:
+            return None
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Token inválido.')
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        try:
+            payload = signing.loads(token, salt=SIGNED_TOKEN_SALT, max_age=settings.BOOKS_SIGNED_TOKEN_MAX_AGE)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token caducado.')
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Token inválido.')
+
+        key = ('user', payload['u'])
+        cached = _cache.get(key)
+        if cached is None:
+            user = get_user_model().objects.filter(pk=payload['u']).first()
+            if user is None or not user.is_active:
+                raise exceptions.AuthenticationFailed('Usuario inactivo o eliminado.')
+            _cache.set(key, (user, None))
+        else:
+            user = cached[0]
+        if payload.get('h') != _signature_hash(user):
+            raise exceptions.AuthenticationFailed('Token inválido.')
+        return copy.copy(user), token
@@ -0,0 +1,166 @@
+"""
+Reproducible benchmarks of the hot HTML views and API endpoints.
+
+Each dataset is one user ("bench-views-<n>") with BOOKS_PER_USER books and n
+sessions generated from a fixed seed, so runs are comparable across machines
+and database backends. For every endpoint it records the query count, p50/p95
+latency and peak Python memory of a request, and compares them with the
+budgets below. scripts/bench_views.py is the command-line front end; the
+test suite checks the query budgets on the smallest dataset.
+"""
+
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import cache as user_cache, deletion
+from .models import Book, DailyReadingTotal, ReadingSession
+
+DATASETS = (10, 1_000, 100_000)
+BOOKS_PER_USER = 50
+HISTORY_DAYS = 3 * 365
+
+# Queries per request with a cold cache (session + user lookups included).
+# They must not grow with the dataset.
+QUERY_BUDGETS = {
+    'book_list': 4,
+    'book_detail': 4,
+    'reading_stats': 3,
+    'api_books': 4,
+    'api_sessions': 5,
+}
+
+# p95 latency in milliseconds per dataset size, cold cache.
+LATENCY_BUDGETS_MS = {
+    10: {'book_list': 150, 'book_detail': 150, 'reading_stats': 100, 'api_books': 150, 'api_sessions': 100},
+    1_000: {'book_list': 200, 'book_detail': 150, 'reading_stats': 100, 'api_books': 200, 'api_sessions': 100},
+    100_000: {'book_list': 200, 'book_detail': 150, 'reading_stats': 150, 'api_books': 200, 'api_sessions': 150},
+}
+
+# Peak Python allocations during one request, in KiB, per dataset size.
+MEMORY_BUDGETS_KB = {
+    10: {'book_list': 2048, 'book_detail': 1024, 'reading_stats': 512, 'api_books': 1024, 'api_sessions': 512},
+    1_000: {'book_list': 2048, 'book_detail': 1024, 'reading_stats': 512, 'api_books': 1024, 'api_sessions': 512},
+    100_000: {'book_list': 2048, 'book_detail': 1024, 'reading_stats': 512, 'api_books': 1024, 'api_sessions': 512},
+}
+
+
+def seed(sessions, batch_size=5000):
+    """Create (or reuse) the user of the ``sessions`` dataset."""
+    user, created = User.objects.get_or_create(username=f'bench-views-{sessions}')
+    if not created and ReadingSession.objects.filter(book__user=user).count() == sessions:
+        return user
+    deletion.delete_books(Book.objects.filter(user=user))
+
+    rng = random.Random(sessions)
+    statuses = ['PENDING', 'READING', 'COMPLETED']
+    books = Book.objects.bulk_create(
+        Book(user=user, title=f'Libro {i}', author=f'Autor {i % 7}', total_pages=1000, status=statuses[i % 3])
+        for i in range(BOOKS_PER_USER)
+    )
+    today = timezone.localdate()
+    start = today - timedelta(days=HISTORY_DAYS)
+    batch = []
+    for i in range(sessions):
+        batch.append(ReadingSession(
+            book=books[i % BOOKS_PER_USER],
+            end_page=rng.randint(1, 1000),
+            duration_minutes=Decimal(rng.randint(5, 90)),
+            date=start + timedelta(days=rng.randrange(HISTORY_DAYS + 1)),
+        ))
+        if len(batch) >= batch_size:
+            # _base_manager skips the per-batch upkeep; it is redone once below.
+            ReadingSession._base_manager.bulk_create(batch)
+            batch = []
+    if batch:
+        ReadingSession._base_manager.bulk_create(batch)
+    Book.objects.filter(user=user).refresh_progress()
+    DailyReadingTotal.objects.rebuild(user.pk, start, today)
+    return user
+
+
+def endpoints(user):
+    book = Book.objects.filter(user=user).order_by('pk').first()
+    return {
+        'book_list': '/',
+        'book_detail': f'/book/{book.pk}/',
+        'reading_stats': '/estadisticas/',
+        'api_books': '/api/books/',
+        'api_sessions': f'/api/books/{book.pk}/sessions/',
+    }
+
+
+def _get(client, user, url, warm):
+    # Cold runs start the user on a new cache version rather than clearing the
+    # cache, which on Redis would also drop other users' entries and sessions.
+    if not warm:
+        user_cache.expire_user(user.pk)
+    response = client.get(url)
+    if response.status_code != 200:
+        raise AssertionError(f'GET {url} -> {response.status_code}')
+    return response
+
+
+def measure(client, user, url, repeat=20, warm=False):
+    """Query count, p50/p95 latency (ms) and peak memory (KiB) of ``user`` GETting ``url``."""
+    _get(client, user, url, warm)  # warm-up: imports, template loading, connection
+    with CaptureQueriesContext(connection) as ctx:
+        _get(client, user, url, warm)
+    queries = len(ctx.captured_queries)
+
+    timings = []
+    for _ in range(repeat):
+        if not warm:
+            user_cache.expire_user(user.pk)
+        t0 = time.perf_counter()
+        _get(client, user, url, warm=True)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    try:
+        _get(client, user, url, warm)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'queries': queries,
+        'p50_ms': statistics.median(timings),
+        'p95_ms': statistics.quantiles(timings, n=20)[18] if len(timings) > 1 else timings[0],
+        'peak_kb': peak / 1024,
+    }
+
+
+def run(sessions, repeat=20, warm=False):
+    """Measure every endpoint on the ``sessions`` dataset."""
+    user = seed(sessions)
+    client = Client()
+    client.force_login(user)
+    return {name: measure(client, user, url, repeat, warm) for name, url in endpoints(user).items()}
+
+
+def over_budget(results, sessions, query_budgets=None, latency_budgets=None, memory_budgets=None):
+    """List of human-readable budget violations (empty when everything fits)."""
+    query_budgets = QUERY_BUDGETS if query_budgets is None else query_budgets
+    latency_budgets = LATENCY_BUDGETS_MS.get(sessions, {}) if latency_budgets is None else latency_budgets
+    memory_budgets = MEMORY_BUDGETS_KB.get(sessions, {}) if memory_budgets is None else memory_budgets
+    problems = []
+    for name, result in results.items():
+        checks = (
+            ('queries', result['queries'], query_budgets.get(name)),
+            ('p95_ms', result['p95_ms'], latency_budgets.get(name)),
+            ('peak_kb', result['peak_kb'], memory_budgets.get(name)),
+        )
+        for metric, value, budget in checks:
+            if budget is not None and value > budget:
+                problems.append(f'{name} ({sessions} sesiones): {metric} {value:.1f} > {budget}')
+    return problems
@@ -0,0 +1,104 @@
+"""
+Per-user cache for rendered fragments and API payloads.
+
+Keys embed a per-user version and a global version (categories are shared by
+every user). Writes never delete entries: the model save/delete paths bump
+the version (invalidate_users / invalidate_all) once the transaction
+commits, so every key built afterwards is new and stale entries simply
+expire. The versions must be shared by every worker, so the cache is only
+used with a shared backend by default (settings.BOOKS_USER_CACHE, on with
+Redis; the BOOKS_USER_CACHE env var forces it on, e.g. for local memory with a
+single worker, or off); otherwise get_or_build() always builds.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GLOBAL_VERSION_KEY = 'books:v:global'
+
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0}
+
+
+def _user_version_key(user_id):
+    return f'books:v:user:{user_id}'
+
+
+def _new_version():
+    # Not 1: if a version key is evicted, a restarted counter must not collide
+    # with versions that may still have live entries.
+    return int(time.time() * 1000)
+
+
+def _versions(user_id):
+    keys = [_user_version_key(user_id), GLOBAL_VERSION_KEY]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _new_version(), timeout=None)
+            found[key] = cache.get(key)
+    return found[keys[0]], found[keys[1]]
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def _bump(key):
+    # Bumping before the commit would let a concurrent request rebuild the
+    # entry from the old rows under the new version, where it would stay.
+    transaction.on_commit(lambda: _incr(key))
+
+
+def invalidate_users(user_ids):
+    for user_id in set(user_ids) - {None}:
+        _bump(_user_version_key(user_id))
+
+
+def invalidate_all():
+    _bump(GLOBAL_VERSION_KEY)
+
+
+def expire_user(user_id):
+    """Move ``user_id`` to a new version now, without waiting for a commit."""
+    _incr(_user_version_key(user_id))
+
+
+def make_key(user_id, *parts):
+    user_version, global_version = _versions(user_id)
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'books:{user_id}:{user_version}:{global_version}:{digest}'
+
+
+def get_or_build(user_id, parts, build, timeout=None):
+    """Return the cached value for ``parts`` or store ``build()``."""
+    if not settings.BOOKS_USER_CACHE:
+        return build()
+    key = make_key(user_id, *parts)
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+    _count('misses')
+    value = build()
+    cache.set(key, value, settings.BOOKS_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def stats():
+    """Hit/miss counters of this process."""
+    with _lock:
+        return dict(_counters)
@@ -0,0 +1,85 @@
+"""
+Conditional GET for the API.
+
+Validators come from timestamps only (Book.updated_at, which session writes
+also bump, and Category.updated_at), so an If-None-Match hit is answered with
+304 after one small aggregate, before any serialization or cache lookup.
+Collections only get an ETag: Last-Modified cannot see deletions.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import Book, Category
+
+
+def conditional_get(etag_func=None, last_modified_func=None):
+    """``condition()`` for viewset methods, applied to GET/HEAD only."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(self, request, *args, **kwargs)
+            view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(
+                lambda req, *a, **kw: method(self, req, *a, **kw)
+            )
+            response = view(request, *args, **kwargs)
+            # Per-user payloads: never shared, always revalidated.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _etag(request, *state):
+    raw = repr((request.user.pk, request.get_full_path(), *state))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def book_list_etag(request, *args, **kwargs):
+    state = Book.objects.filter(user=request.user).aggregate(
+        last=Max('updated_at'),
+        count=Count('id'),
+        category_last=Max('category__updated_at'),
+        category_count=Count('category'),
+    )
+    return _etag(request, *state.values())
+
+
+def _book_state(request, pk):
+    if not hasattr(request, '_book_state'):
+        try:
+            request._book_state = (
+                Book.objects.filter(user=request.user, pk=pk)
+                .values_list('updated_at', 'category__updated_at')
+                .first()
+            )
+        except (TypeError, ValueError):
+            request._book_state = None  # malformed pk: let the view answer 404
+    return request._book_state
+
+
+def book_etag(request, pk=None, **kwargs):
+    state = _book_state(request, pk)
+    return _etag(request, *state) if state else None
+
+
+def book_last_modified(request, pk=None, **kwargs):
+    state = _book_state(request, pk)
+    return max(t for t in state if t is not None) if state else None
+
+
+def category_list_etag(request, *args, **kwargs):
+    state = Category.objects.aggregate(last=Max('updated_at'), count=Count('id'))
+    return _etag(request, *state.values())
+
+
+def category_last_modified(request, pk=None, **kwargs):
+    try:
+        return Category.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,210 @@
+"""
+Local thumbnails of ``Book.cover_url``.
+
+The pages used to hotlink the full-size remote image for an 80x112 card.
+Now each cover is downloaded once and stored as a center-cropped WebP at
+every WIDTHS (5:7, the shape of the cards) under BOOKS_COVER_CACHE_DIR,
+keyed by a hash of the URL; /book/<pk>/cover/<width>/ reads the file.
+``manage.py fetch_covers`` builds them ahead of time; otherwise the first
+request does, holding a per-cover file lock so that the other widths of
+the same srcset wait for it instead of downloading again. Templates link
+them through ``{% cover_img %}`` with a srcset, and the URL carries the key,
+so the browser may cache it for good; a new cover_url is a new URL.
+
+A cover that cannot be fetched or decoded is remembered for
+BOOKS_COVER_RETRY_SECONDS; meanwhile the view redirects to the original
+URL, as before. Downloads only go to public addresses (no SSRF into the
+private network) unless BOOKS_COVER_ALLOW_PRIVATE_HOSTS is set; the socket
+connects to the very addresses that were checked, so DNS rebinding cannot
+slip past the check.
+"""
+
+import fcntl
+import hashlib
+import http.client
+import ipaddress
+import os
+import socket
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+WIDTHS = (80, 160, 320)
+ASPECT = 7 / 5
+QUALITY = 80
+USER_AGENT = 'BookTracker cover fetcher'
+
+
+class CoverUnavailable(Exception):
+    pass
+
+
+def cover_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+def _directory(url):
+    return Path(settings.BOOKS_COVER_CACHE_DIR) / cover_key(url)
+
+
+def thumbnail_path(url, width):
+    return _directory(url) / f'{width}.webp'
+
+
+def _check_url(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise CoverUnavailable(f'not an http(s) URL: {url}')
+
+
+def _public_addresses(host, port):
+    """The IP addresses of ``host``; CoverUnavailable if any of them is not public."""
+    try:
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except OSError as exc:
+        raise CoverUnavailable(str(exc))
+    addresses = [info[4][0] for info in infos]
+    if not settings.BOOKS_COVER_ALLOW_PRIVATE_HOSTS:
+        for address in addresses:
+            if not ipaddress.ip_address(address.split('%')[0]).is_global:
+                raise CoverUnavailable(f'{host} is not a public address')
+    return addresses
+
+
+class _PinnedConnection:
+    """Connects to the addresses _public_addresses() checked, from that one lookup.
+
+    Checking the host and then letting the socket resolve it again would
+    let a DNS answer that changes in between (rebinding) reach a private
+    address. Host header, SNI and certificate checks still use the name.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = self._connect_checked
+
+    def _connect_checked(self, address, timeout, source_address=None):
+        host, port = address
+        error = None
+        for ip in _public_addresses(host, port):
+            try:
+                return socket.create_connection((ip, port), timeout, source_address)
+            except OSError as exc:
+                error = exc
+        raise error
+
+
+class _PinnedHTTPConnection(_PinnedConnection, http.client.HTTPConnection):
+    pass
+
+
+class _PinnedHTTPSConnection(_PinnedConnection, http.client.HTTPSConnection):
+    pass
+
+
+class _PinnedHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PinnedHTTPConnection, req)
+
+
+class _PinnedHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PinnedHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirects(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# No proxies: the address check must see the cover host, not the proxy.
+_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _PinnedHTTPHandler, _PinnedHTTPSHandler, _CheckedRedirects
+)
+
+
+def fetch(url):
+    """The bytes at ``url``; CoverUnavailable on any failure or past BOOKS_COVER_MAX_BYTES."""
+    _check_url(url)
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT, 'Accept': 'image/*'})
+    limit = settings.BOOKS_COVER_MAX_BYTES
+    try:
+        with _opener.open(request, timeout=settings.BOOKS_COVER_TIMEOUT) as response:
+            data = response.read(limit + 1)
+    except (OSError, ValueError) as exc:
+        raise CoverUnavailable(str(exc))
+    if len(data) > limit:
+        raise CoverUnavailable(f'{url} is larger than {limit} bytes')
+    return data
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_thumbnails(url):
+    """Download ``url`` and write all WIDTHS; CoverUnavailable if that fails."""
+    directory = _directory(url)
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        image = Image.open(BytesIO(fetch(url)))
+        image.draft('RGB', (WIDTHS[-1] * 2, round(WIDTHS[-1] * ASPECT) * 2))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    except (CoverUnavailable, OSError, ValueError, Image.DecompressionBombError) as exc:
+        (directory / 'failed').write_text(str(exc))
+        raise CoverUnavailable(str(exc))
+    for width in WIDTHS:
+        thumbnail = ImageOps.fit(image, (width, round(width * ASPECT)), Image.LANCZOS)
+        buffer = BytesIO()
+        thumbnail.save(buffer, 'WEBP', quality=QUALITY, method=6)
+        _write_atomic(thumbnail_path(url, width), buffer.getvalue())
+    (directory / 'failed').unlink(missing_ok=True)
+
+
+def _failed_recently(url):
+    failed = _directory(url) / 'failed'
+    return failed.exists() and time.time() - failed.stat().st_mtime < settings.BOOKS_COVER_RETRY_SECONDS
+
+
+@contextmanager
+def _building(url):
+    """Exclusive lock on ``url``'s cover directory, across threads and worker processes."""
+    directory = _directory(url)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / 'lock', 'wb') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def thumbnail(url, width):
+    """Path of the ``width`` thumbnail of ``url``, fetching it on first use; None if unavailable."""
+    path = thumbnail_path(url, width)
+    if path.exists():
+        return path
+    if _failed_recently(url):
+        return None
+    with _building(url):
+        # Whoever held the lock may have built it, or failed, meanwhile.
+        if path.exists():
+            return path
+        if _failed_recently(url):
+            return None
+        try:
+            build_thumbnails(url)
+        except CoverUnavailable:
+            return None
+    return path
@@ -0,0 +1,85 @@
+"""
+Bulk deletion of books and whole accounts.
+
+Django's delete() collects every related row into Python before deleting
+(and book.delete() also rebuilds the daily rollup and records tombstones
+per call), which for a reader with a long history means seconds and a lot
+of memory. Here sessions go first, with plain DELETEs of at most
+``batch_size`` rows per transaction; the books then go in batches too,
+with nothing left for the collector to cascade. The derived data is kept
+consistent on the way: each batch of books is deleted in the same
+transaction that records their tombstones for /api/sync/ and rebuilds the
+daily rollup of their days, and the per-user caches are invalidated.
+
+A crash halfway leaves a partially deleted library in which every deleted
+book has its tombstone and rebuilt rollup; running the same call again
+finishes the job. Only a crash between a batch's session and book DELETEs
+leaves days whose rollup still counts the deleted sessions, which
+``rebuild_daily_totals`` fixes.
+"""
+
+from django.db import transaction
+from django.db.models import Subquery
+
+from .cache import invalidate_users
+from .models import Book, DailyReadingTotal, ReadingSession, Tombstone, _rebuild_spans, _session_spans
+
+BATCH_SIZE = 5000
+
+
+def _delete_in_batches(queryset, batch_size):
+    """DELETE ... WHERE id IN (SELECT id ... LIMIT batch_size) until nothing matches.
+
+    The ids never reach Python. Precondition: every row pointing to the
+    matched rows has been deleted already (delete_user removes sessions
+    before books), so Django's collector has nothing to cascade or load.
+    Models nothing points to are deleted with a single statement; for the
+    others the collector adds one empty lookup per relation and batch.
+    """
+    model = queryset.model
+    # _base_manager: no queryset upkeep; the callers fix the derived data once.
+    batch = model._base_manager.filter(pk__in=Subquery(queryset.order_by().values('pk')[:batch_size]))
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            n = batch.delete()[0]
+        if not n:
+            return deleted
+        deleted += n
+
+
+def delete_books(books, batch_size=BATCH_SIZE):
+    """Delete the ``books`` queryset with its sessions; returns {'books': n, 'sessions': n}."""
+    book_ids = list(books.order_by().values_list('pk', flat=True))
+    counts = {'books': 0, 'sessions': 0}
+    user_ids = set()
+    for start in range(0, len(book_ids), batch_size):
+        chunk = book_ids[start:start + batch_size]
+        rows = list(Book._base_manager.filter(pk__in=chunk).values_list('user_id', 'pk'))
+        spans = _session_spans(book__in=chunk)
+        counts['sessions'] += _delete_in_batches(ReadingSession._base_manager.filter(book_id__in=chunk), batch_size)
+        with transaction.atomic():
+            counts['books'] += Book._base_manager.filter(pk__in=chunk).delete()[0]
+            Tombstone.record('book', rows)
+            _rebuild_spans(spans)
+        user_ids.update(user_id for user_id, _ in rows)
+    invalidate_users(user_ids)
+    return counts
+
+
+def delete_user(user, batch_size=BATCH_SIZE):
+    """Delete ``user`` and everything they own; returns the counts per model."""
+    user_id = user.pk
+    sessions = ReadingSession._base_manager.filter(book__user=user)
+    counts = {
+        'sessions': _delete_in_batches(sessions, batch_size),
+        'daily_totals': _delete_in_batches(DailyReadingTotal.objects.filter(user=user), batch_size),
+        'tombstones': _delete_in_batches(Tombstone.objects.filter(user=user), batch_size),
+        'books': _delete_in_batches(Book._base_manager.filter(user=user), batch_size),
+    }
+    # What is left (tokens, permissions, admin log) is small; the regular
+    # delete also fires the signals that evict cached authentication.
+    user.delete()
+    invalidate_users([user_id])
+    counts['users'] = 1
+    return counts
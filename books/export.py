@@ -0,0 +1,95 @@
+"""
+Streaming export of a user's library.
+
+Rows are read with values_list(...).iterator(chunk_size=...) (a server-side
+cursor on PostgreSQL) and written out in small text chunks, so memory stays
+flat however long the reading history is.
+"""
+
+import csv
+import io
+import json
+from decimal import Decimal
+
+from .models import Book, ReadingSession
+
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+BOOK_FIELDS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('author', 'author'),
+    ('total_pages', 'total_pages'),
+    ('status', 'status'),
+    ('category', 'category__name'),
+    ('cover_url', 'cover_url'),
+    ('pages_read', 'max_end_page'),
+    ('total_minutes', 'total_minutes'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+SESSION_FIELDS = [
+    ('id', 'id'),
+    ('book', 'book_id'),
+    ('book_title', 'book__title'),
+    ('date', 'date'),
+    ('end_page', 'end_page'),
+    ('duration_minutes', 'duration_minutes'),
+    ('notes', 'notes'),
+]
+
+RESOURCES = {
+    'books': (
+        BOOK_FIELDS,
+        lambda user: Book.objects.filter(user=user).order_by('id'),
+    ),
+    'sessions': (
+        SESSION_FIELDS,
+        lambda user: ReadingSession.objects.filter(book__user=user).order_by('book_id', 'date', 'id'),
+    ),
+}
+
+
+def _rows(user, resource):
+    fields, queryset = RESOURCES[resource]
+    return queryset(user).values_list(*(source for _, source in fields)).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(user, resource):
+    fields, _ = RESOURCES[resource]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(name for name, _ in fields)
+    for i, row in enumerate(_rows(user, resource), start=1):
+        writer.writerow(_plain(v) if v is not None else '' for v in row)
+        if i % ROWS_PER_WRITE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(user, resources):
+    for resource in resources:
+        fields, _ = RESOURCES[resource]
+        names = [name for name, _ in fields]
+        kind = resource[:-1]  # "books" -> "book"
+        lines = []
+        for row in _rows(user, resource):
+            record = {'type': kind, **{n: _plain(v) for n, v in zip(names, row)}}
+            lines.append(json.dumps(record, ensure_ascii=False))
+            if len(lines) == ROWS_PER_WRITE:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
@@ -0,0 +1,47 @@
+import subprocess
+from pathlib import Path
+
+import pytailwindcss
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pytailwindcss.exceptions import PyTailwindCssException
+
+# Pinned: every machine must build the same file for --check to mean anything.
+TAILWINDCSS_VERSION = 'v4.3.3'
+INPUT = 'assets/css/app.css'
+OUTPUT = 'static/css/app.css'
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds static/css/app.css from assets/css/app.css and tailwind.config.js with the standalone '
+        'Tailwind CLI (pytailwindcss downloads it on first use). Run it after changing classes in a template; '
+        'collectstatic then fingerprints and compresses it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Do not write; exit with an error if static/css/app.css is out of date',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            css = pytailwindcss.run(
+                ['--input', INPUT, '--minify'],
+                cwd=settings.BASE_DIR, auto_install=True, version=TAILWINDCSS_VERSION,
+            ) + '\n'
+        except subprocess.CalledProcessError as exc:
+            raise CommandError(f'tailwindcss failed: {exc.stderr.decode().strip()}')
+        except PyTailwindCssException as exc:
+            raise CommandError(str(exc))
+        output = Path(settings.BASE_DIR) / OUTPUT
+        current = output.read_text(encoding='utf-8') if output.exists() else None
+        if options['check']:
+            if current != css:
+                raise CommandError(f'{OUTPUT} is out of date; run manage.py build_css')
+            self.stdout.write(self.style.SUCCESS(f'{OUTPUT} is up to date'))
+            return
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(css, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {OUTPUT}: {len(css.encode()) / 1024:.1f} KiB'))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes expired django_session rows in batches. Unlike clearsessions it also works after '
+        'switching to the cache or signed_cookies session backends, which leave old rows behind'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now).order_by()
+        deleted = 0
+        # Small batches keep each DELETE (and its locks) short on a live database.
+        while True:
+            keys = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted += Session.objects.filter(pk__in=keys).delete()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired session(s); engine: {settings.SESSION_ENGINE}'
+        ))
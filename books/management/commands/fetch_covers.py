@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from books import covers
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = (
+        'Downloads the covers that have no local thumbnails yet (books/covers.py), so that the first '
+        'page view does not wait for them. Covers that failed recently are skipped until '
+        'BOOKS_COVER_RETRY_SECONDS have passed'
+    )
+
+    def handle(self, *args, **options):
+        urls = Book.objects.exclude(cover_url__isnull=True).exclude(cover_url='').values_list('cover_url', flat=True)
+        built = failed = 0
+        for url in urls.distinct().iterator():
+            if covers.thumbnail_path(url, covers.WIDTHS[-1]).exists():
+                continue
+            if covers.thumbnail(url, covers.WIDTHS[-1]) is None:
+                failed += 1
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'Fetched {built} cover(s); {failed} unavailable'))
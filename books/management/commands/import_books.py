@@ -0,0 +1,35 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer import DEFAULT_BATCH_SIZE, import_books
+
+
+class Command(BaseCommand):
+    help = 'Imports books from a CSV file (BookTracker export or Goodreads export) into a user library'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='CSV file, UTF-8')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist")
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                report = import_books(user, lines, batch_size=options['batch_size'])
+        except (OSError, UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(str(exc))
+
+        for error in report['errors']:
+            self.stderr.write(f"  line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} book(s) from {report['rows']} row(s): "
+            f"{report['duplicates']} duplicate(s), {report['error_count']} error(s), "
+            f"{report['categories_created']} new categor(ies) "
+            f"in {report['seconds']}s ({report['rows_per_second']} rows/s)"
+        ))
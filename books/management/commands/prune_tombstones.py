@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from books.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Deletes /api/sync/ tombstones older than BOOKS_SYNC_TOMBSTONE_DAYS, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} tombstone(s) older than {settings.BOOKS_SYNC_TOMBSTONE_DAYS} day(s)'
+        ))
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from books.deletion import BATCH_SIZE, delete_user
+from books.management.commands.seed_books import SYNTHETIC_PREFIX
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes users and all their books, sessions and rollups with batched set-based DELETEs '
+        '(see books.deletion), much faster than the admin for long reading histories'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*')
+        parser.add_argument(
+            '--synthetic', action='store_true', help=f'Also purge the "{SYNTHETIC_PREFIX}*" load-test users'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__in=options['usernames']))
+        missing = set(options['usernames']) - {user.username for user in users}
+        if missing:
+            raise CommandError(f'Unknown user(s): {", ".join(sorted(missing))}')
+        if options['synthetic']:
+            users += User.objects.filter(username__startswith=SYNTHETIC_PREFIX).exclude(pk__in=[u.pk for u in users])
+        if not users:
+            raise CommandError('Name at least one user, or pass --synthetic')
+
+        totals = {}
+        for user in users:
+            for model, n in delete_user(user, options['batch_size']).items():
+                totals[model] = totals.get(model, 0) + n
+        self.stdout.write(self.style.SUCCESS(
+            'Purged ' + ', '.join(f'{n} {model}' for model, n in totals.items())
+        ))
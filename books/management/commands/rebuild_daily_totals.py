@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from books.models import DailyReadingTotal, ReadingSession
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DailyReadingTotal rollup from the full reading session history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', metavar='USERNAME', help='Only rebuild these users')
+
+    def handle(self, *args, **options):
+        sessions = ReadingSession.objects.all()
+        totals = DailyReadingTotal.objects.all()
+        if options['users']:
+            user_ids = list(User.objects.filter(username__in=options['users']).values_list('pk', flat=True))
+            sessions = sessions.filter(book__user_id__in=user_ids)
+            totals = totals.filter(user_id__in=user_ids)
+
+        spans = (
+            sessions.values('book__user_id')
+            .annotate(start=models.Min('date'), end=models.Max('date'))
+            .values_list('book__user_id', 'start', 'end')
+            .order_by()
+        )
+        totals.delete()
+        count = 0
+        for user_id, start, end in spans:
+            DailyReadingTotal.objects.rebuild(user_id, start, end)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily reading totals for {count} user(s)'))
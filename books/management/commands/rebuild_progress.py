@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized progress counters (max_end_page, total_minutes, session_count) of every book'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Book.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            Book.objects.filter(pk__in=ids[start:start + batch_size]).refresh_progress(touch=False, status=False)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt progress counters for {len(ids)} book(s)'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from books.cache import invalidate_all
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = (
+        'Rederives PENDING / READING / COMPLETED from the reading sessions of every book, '
+        'one UPDATE per pk range. Books without sessions keep their status'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Book.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        changed = 0
+        if bounds['low'] is not None:
+            # pk ranges instead of id lists: nothing is loaded into Python.
+            for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+                changed += Book.objects.filter(pk__gte=start, pk__lt=start + batch_size).refresh_status()
+        if changed:
+            invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed book statuses: {changed} changed'))
@@ -1,116 +1,225 @@
-from django.core.management.base import BaseCommand
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from books.models import Book, Category
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from books.cache import invalidate_users
+from books.models import Book, Category, DailyReadingTotal, ReadingSession
+
+CATEGORIES = {
+    "FINANCE": "Finanzas y Riqueza",
+    "PRODUCTIVITY": "Productividad y Eficiencia",
+    "MINDSET": "Mentalidad y Estoicismo",
+    "STRATEGY": "Estrategia y Poder",
+    "BIOGRAPHY": "Biografías y Negocios"
+}
+
+BOOKS = [
+    # Finance
+    ("La Psicología del Dinero", "Morgan Housel", "FINANCE", 256),
+    ("El hombre más rico de Babilonia", "George S. Clason", "FINANCE", 144),
+    ("La vía rápida del millonario", "MJ DeMarco", "FINANCE", 336),
+    ("Padre Rico, Padre Pobre", "Robert Kiyosaki", "FINANCE", 336),
+    ("El camino simple hacia la riqueza", "JL Collins", "FINANCE", 286),
+    ("Te enseñaré a ser rico", "Ramit Sethi", "FINANCE", 352),
+    ("El millonario de la puerta de al lado", "Thomas J. Stanley", "FINANCE", 258),
+    ("Los secretos de la mente millonaria", "T. Harv Eker", "FINANCE", 224),
+    ("Dinero: Domina el juego", "Tony Robbins", "FINANCE", 688),
+    ("La bolsa o la vida", "Vicki Robin & Joe Dominguez", "FINANCE", 400),
+    ("Un paso por delante de Wall Street", "Peter Lynch", "FINANCE", 304),
+    ("El inversor inteligente", "Benjamin Graham", "FINANCE", 640),
+    ("El patrón Bitcoin", "Saifedean Ammous", "FINANCE", 304),
+
+    # Productivity
+    ("Hábitos Atómicos", "James Clear", "PRODUCTIVITY", 320),
+    ("Céntrate (Deep Work)", "Cal Newport", "PRODUCTIVITY", 304),
+    ("Esencialismo", "Greg McKeown", "PRODUCTIVITY", 272),
+    ("El Principio 80/20", "Richard Koch", "PRODUCTIVITY", 336),
+    ("Hazlo tan bien que no puedan ignorarte", "Cal Newport", "PRODUCTIVITY", 304),
+    ("El poder de los hábitos", "Charles Duhigg", "PRODUCTIVITY", 416),
+    ("Organízate con eficacia (GTD)", "David Allen", "PRODUCTIVITY", 352),
+    ("Algoritmos para la vida cotidiana", "Brian Christian & Tom Griffiths", "PRODUCTIVITY", 368),
+    ("La semana laboral de 4 horas", "Tim Ferriss", "PRODUCTIVITY", 416),
+
+    # Mindset
+    ("No me puedes lastimar (Can't Hurt Me)", "David Goggins", "MINDSET", 364),
+    ("Meditaciones", "Marco Aurelio", "MINDSET", 256),
+    ("El obstáculo es el camino", "Ryan Holiday", "MINDSET", 224),
+    ("El ego es el enemigo", "Ryan Holiday", "MINDSET", 256),
+    ("Piense y Hágase Rico", "Napoleon Hill", "MINDSET", 238),
+    ("El hombre en busca de sentido", "Viktor Frankl", "MINDSET", 160),
+    ("Maestría", "Robert Greene", "MINDSET", 352),
+    ("Mindset: La actitud del éxito", "Carol Dweck", "MINDSET", 320),
+    ("Los seis pilares de la autoestima", "Nathaniel Branden", "MINDSET", 368),
+
+    # Strategy
+    ("Rompe la barrera del no", "Chris Voss", "STRATEGY", 288),
+    ("Las 48 leyes del poder", "Robert Greene", "STRATEGY", 480),
+    ("Cómo ganar amigos e influir sobre las personas", "Dale Carnegie", "STRATEGY", 288),
+    ("Influencia", "Robert Cialdini", "STRATEGY", 320),
+    ("El arte de la guerra", "Sun Tzu", "STRATEGY", 128),
+    ("Conversaciones cruciales", "Kerry Patterson", "STRATEGY", 256),
+    ("Jugar para ganar (Skin in the Game)", "Nassim Nicholas Taleb", "STRATEGY", 304),
+    ("Antifragil", "Nassim Nicholas Taleb", "STRATEGY", 544),
+
+    # Biography/Business
+    ("Principios", "Ray Dalio", "BIOGRAPHY", 592),
+    ("Cero a Uno", "Peter Thiel", "BIOGRAPHY", 224),
+    ("El Almanaque de Naval Ravikant", "Eric Jorgenson", "BIOGRAPHY", 244),
+    ("Pensar rápido, pensar despacio", "Daniel Kahneman", "BIOGRAPHY", 499),
+    ("Steve Jobs", "Walter Isaacson", "BIOGRAPHY", 656),
+    ("Elon Musk", "Walter Isaacson", "BIOGRAPHY", 688),
+    ("Nunca te pares (Shoe Dog)", "Phil Knight", "BIOGRAPHY", 400),
+    ("Lo difícil de las cosas difíciles", "Ben Horowitz", "BIOGRAPHY", 304),
+    ("De bueno a excelente (Good to Great)", "Jim Collins", "BIOGRAPHY", 320),
+    ("Sapiens: De animales a dioses", "Yuval Noah Harari", "BIOGRAPHY", 496),
+    ("Economía básica", "Thomas Sowell", "BIOGRAPHY", 704),
+]
+
+SYNTHETIC_PREFIX = 'seed-'
+SYNTHETIC_DAYS = 2 * 365
+
 
 class Command(BaseCommand):
-    help = 'Seeds the database with initial books for all users'
-
-    def handle(self, *args, **kwargs):
-        # Create categories
-        categories = {
-            "FINANCE": "Finanzas y Riqueza",
-            "PRODUCTIVITY": "Productividad y Eficiencia",
-            "MINDSET": "Mentalidad y Estoicismo",
-            "STRATEGY": "Estrategia y Poder",
-            "BIOGRAPHY": "Biografías y Negocios"
-        }
-        
-        cat_objs = {}
-        for key, name in categories.items():
-            cat, created = Category.objects.get_or_create(name=name)
-            cat_objs[key] = cat
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created category: {name}'))
-
-        books_data = [
-            # Finance
-            ("La Psicología del Dinero", "Morgan Housel", "FINANCE", 256),
-            ("El hombre más rico de Babilonia", "George S. Clason", "FINANCE", 144),
-            ("La vía rápida del millonario", "MJ DeMarco", "FINANCE", 336),
-            ("Padre Rico, Padre Pobre", "Robert Kiyosaki", "FINANCE", 336),
-            ("El camino simple hacia la riqueza", "JL Collins", "FINANCE", 286),
-            ("Te enseñaré a ser rico", "Ramit Sethi", "FINANCE", 352),
-            ("El millonario de la puerta de al lado", "Thomas J. Stanley", "FINANCE", 258),
-            ("Los secretos de la mente millonaria", "T. Harv Eker", "FINANCE", 224),
-            ("Dinero: Domina el juego", "Tony Robbins", "FINANCE", 688),
-            ("La bolsa o la vida", "Vicki Robin & Joe Dominguez", "FINANCE", 400),
-            ("Un paso por delante de Wall Street", "Peter Lynch", "FINANCE", 304),
-            ("El inversor inteligente", "Benjamin Graham", "FINANCE", 640),
-            ("El patrón Bitcoin", "Saifedean Ammous", "FINANCE", 304),
-            
-            # Productivity
-            ("Hábitos Atómicos", "James Clear", "PRODUCTIVITY", 320),
-            ("Céntrate (Deep Work)", "Cal Newport", "PRODUCTIVITY", 304),
-            ("Esencialismo", "Greg McKeown", "PRODUCTIVITY", 272),
-            ("El Principio 80/20", "Richard Koch", "PRODUCTIVITY", 336),
-            ("Hazlo tan bien que no puedan ignorarte", "Cal Newport", "PRODUCTIVITY", 304),
-            ("El poder de los hábitos", "Charles Duhigg", "PRODUCTIVITY", 416),
-            ("Organízate con eficacia (GTD)", "David Allen", "PRODUCTIVITY", 352),
-            ("Algoritmos para la vida cotidiana", "Brian Christian & Tom Griffiths", "PRODUCTIVITY", 368),
-            ("La semana laboral de 4 horas", "Tim Ferriss", "PRODUCTIVITY", 416),
-
-            # Mindset
-            ("No me puedes lastimar (Can't Hurt Me)", "David Goggins", "MINDSET", 364),
-            ("Meditaciones", "Marco Aurelio", "MINDSET", 256),
-            ("El obstáculo es el camino", "Ryan Holiday", "MINDSET", 224),
-            ("El ego es el enemigo", "Ryan Holiday", "MINDSET", 256),
-            ("Piense y Hágase Rico", "Napoleon Hill", "MINDSET", 238),
-            ("El hombre en busca de sentido", "Viktor Frankl", "MINDSET", 160),
-            ("Maestría", "Robert Greene", "MINDSET", 352),
-            ("Mindset: La actitud del éxito", "Carol Dweck", "MINDSET", 320),
-            ("Los seis pilares de la autoestima", "Nathaniel Branden", "MINDSET", 368),
-
-            # Strategy
-            ("Rompe la barrera del no", "Chris Voss", "STRATEGY", 288),
-            ("Las 48 leyes del poder", "Robert Greene", "STRATEGY", 480),
-            ("Cómo ganar amigos e influir sobre las personas", "Dale Carnegie", "STRATEGY", 288),
-            ("Influencia", "Robert Cialdini", "STRATEGY", 320),
-            ("El arte de la guerra", "Sun Tzu", "STRATEGY", 128),
-            ("Conversaciones cruciales", "Kerry Patterson", "STRATEGY", 256),
-            ("Jugar para ganar (Skin in the Game)", "Nassim Nicholas Taleb", "STRATEGY", 304),
-            ("Antifragil", "Nassim Nicholas Taleb", "STRATEGY", 544),
-
-            # Biography/Business
-            ("Principios", "Ray Dalio", "BIOGRAPHY", 592),
-            ("Cero a Uno", "Peter Thiel", "BIOGRAPHY", 224),
-            ("El Almanaque de Naval Ravikant", "Eric Jorgenson", "BIOGRAPHY", 244),
-            ("Pensar rápido, pensar despacio", "Daniel Kahneman", "BIOGRAPHY", 499),
-            ("Steve Jobs", "Walter Isaacson", "BIOGRAPHY", 656),
-            ("Elon Musk", "Walter Isaacson", "BIOGRAPHY", 688),
-            ("Nunca te pares (Shoe Dog)", "Phil Knight", "BIOGRAPHY", 400),
-            ("Lo difícil de las cosas difíciles", "Ben Horowitz", "BIOGRAPHY", 304),
-            ("De bueno a excelente (Good to Great)", "Jim Collins", "BIOGRAPHY", 320),
-            ("Sapiens: De animales a dioses", "Yuval Noah Harari", "BIOGRAPHY", 496),
-            ("Economía básica", "Thomas Sowell", "BIOGRAPHY", 704),
-        ]
-
-        # Get all users
-        users = User.objects.all()
-        
-        if not users.exists():
+    help = (
+        'Seeds the starter library for existing users, or generates N users x M books x K sessions '
+        'of synthetic data for load testing (--synthetic-users)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', metavar='USERNAME', help='Only seed these users')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--synthetic-users', type=int, metavar='N',
+            help=f'Create (or reuse) N users named "{SYNTHETIC_PREFIX}<n>" and seed them',
+        )
+        parser.add_argument('--books', type=int, metavar='M', help='Books per synthetic user (default: starter list)')
+        parser.add_argument('--sessions', type=int, default=0, metavar='K', help='Sessions per new synthetic book')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for synthetic data')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+        categories = self.ensure_categories()
+
+        if options['synthetic_users']:
+            user_ids = self.ensure_synthetic_users(options['synthetic_users'])
+            catalog = self.catalog(options['books'] or len(BOOKS))
+        else:
+            users = User.objects.all()
+            if options['users']:
+                users = users.filter(username__in=options['users'])
+            user_ids = list(users.order_by('pk').values_list('pk', flat=True))
+            catalog = BOOKS
+        if not user_ids:
             self.stdout.write(self.style.WARNING('No users found. Please create users first.'))
             return
 
-        self.stdout.write(f'Seeding books for {users.count()} user(s)...')
-        
-        for user in users:
-            self.stdout.write(f'\nProcessing user: {user.username}')
-            
-            for title, author, cat_key, pages in books_data:
-                category = cat_objs.get(cat_key)
-                
-                # Check if this user already has this book
-                if not Book.objects.filter(user=user, title=title).exists():
-                    Book.objects.create(
-                        user=user,
-                        title=title,
-                        author=author,
-                        category=category,
-                        total_pages=pages,
-                        status='PENDING'
-                    )
-                    self.stdout.write(self.style.SUCCESS(f'  ✓ Created book: {title}'))
-                else:
-                    self.stdout.write(self.style.WARNING(f'  - Book already exists: {title}'))
-        
-        self.stdout.write(self.style.SUCCESS('\nSuccessfully seeded books for all users'))
+        self.stdout.write(f'Seeding {len(catalog)} book(s) for {len(user_ids)} user(s)...')
+        created = self.seed_books(user_ids, catalog, categories)
+        self.stdout.write(self.style.SUCCESS(f'Created {len(created)} book(s)'))
+
+        if options['synthetic_users'] and options['sessions'] and created:
+            count = self.seed_sessions(created, options['sessions'], random.Random(options['seed']))
+            self.stdout.write(self.style.SUCCESS(f'Created {count} reading session(s)'))
+
+    def ensure_categories(self):
+        """Starter categories by key, in two queries at most."""
+        slugs = {slugify(name): key for key, name in CATEGORIES.items()}
+        existing = dict(Category.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+        missing = [Category(name=CATEGORIES[slugs[slug]], slug=slug) for slug in slugs if slug not in existing]
+        if missing:
+            # bulk_create skips Category.save(); the slug is set above.
+            Category.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = dict(Category.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+            for category in missing:
+                self.stdout.write(self.style.SUCCESS(f'Created category: {category.name}'))
+        return {slugs[slug]: pk for slug, pk in existing.items()}
+
+    def ensure_synthetic_users(self, count):
+        usernames = [f'{SYNTHETIC_PREFIX}{i:06d}' for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        password = make_password(None)  # unusable; these accounts are for load tests only
+        User.objects.bulk_create(
+            (User(username=name, password=password) for name in usernames if name not in existing),
+            batch_size=self.batch_size,
+        )
+        return list(User.objects.filter(username__in=usernames).order_by('pk').values_list('pk', flat=True))
+
+    def catalog(self, size):
+        """``size`` (title, author, category key, pages) rows cycling over the starter list."""
+        rows = []
+        for i in range(size):
+            title, author, key, pages = BOOKS[i % len(BOOKS)]
+            rows.append((title if i < len(BOOKS) else f'{title} ({i // len(BOOKS) + 1})', author, key, pages))
+        return rows
+
+    def seed_books(self, user_ids, catalog, categories):
+        """Insert the missing (user, title) pairs; returns the created books."""
+        titles = [title for title, *_ in catalog]
+        created = []
+        # Users are processed in chunks so the existing-pairs set stays bounded.
+        per_chunk = max(1, self.batch_size // max(1, len(catalog)))
+        for i in range(0, len(user_ids), per_chunk):
+            chunk = user_ids[i:i + per_chunk]
+            existing = set(
+                Book.objects.filter(user_id__in=chunk, title__in=titles).values_list('user_id', 'title')
+            )
+            books = [
+                Book(
+                    user_id=user_id,
+                    title=title,
+                    author=author,
+                    category_id=categories.get(key),
+                    total_pages=pages,
+                    status='PENDING',
+                )
+                for user_id in chunk
+                for title, author, key, pages in catalog
+                if (user_id, title) not in existing
+            ]
+            created += Book.objects.bulk_create(books, batch_size=self.batch_size)
+        return created
+
+    def seed_sessions(self, books, per_book, rng):
+        today = timezone.localdate()
+        start = today - timedelta(days=SYNTHETIC_DAYS)
+        count = 0
+        batch = []
+        with transaction.atomic():
+            for book in books:
+                # Monotonic progress through part of the book, on increasing days.
+                days = sorted(rng.randrange(SYNTHETIC_DAYS + 1) for _ in range(per_book))
+                pages = sorted(rng.randint(1, max(1, book.total_pages)) for _ in range(per_book))
+                for day, page in zip(days, pages):
+                    batch.append(ReadingSession(
+                        book_id=book.pk,
+                        end_page=page,
+                        duration_minutes=Decimal(rng.randint(5, 90)),
+                        date=start + timedelta(days=day),
+                    ))
+                    if len(batch) >= self.batch_size:
+                        count += self._flush_sessions(batch)
+                        batch = []
+            if batch:
+                count += self._flush_sessions(batch)
+
+            # The per-batch counter and rollup upkeep was skipped; redo it once, set-based.
+            user_ids = {book.user_id for book in books}
+            Book.objects.filter(user_id__in=user_ids).refresh_progress()
+            for user_id in user_ids:
+                DailyReadingTotal.objects.rebuild(user_id, start, today)
+        invalidate_users(user_ids)
+        return count
+
+    def _flush_sessions(self, batch):
+        # _base_manager: plain bulk insert, without ReadingSessionQuerySet's upkeep.
+        ReadingSession._base_manager.bulk_create(batch)
+        return len(batch)
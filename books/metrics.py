@@ -0,0 +1,273 @@
+"""
+Request-level SQL and timing instrumentation.
+
+RequestMetricsMiddleware records, per request, the query count and DB time
+(through an execute_wrapper installed on every connection as it opens, so it
+works with DEBUG off and in the sync_to_async threads that run ORM calls under
+ASGI, whose connections are not the event loop's), the time
+spent rendering templates and the response size. The same SQL statement run
+BOOKS_METRICS_DUPLICATE_THRESHOLD times or more in one request is reported as
+an N+1 suspect. Each request is logged as one JSON line on the
+"books.metrics" logger and added to per-view aggregates exposed by
+metrics_view in Prometheus text format.
+
+Aggregates live in process memory: with several workers each one reports its
+own numbers, as with books.cache.stats().
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import cache as user_cache
+
+logger = logging.getLogger('books.metrics')
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current = contextvars.ContextVar('books_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+        self.statements = Counter()
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        """(sql, times) of statements repeated at least ``threshold`` times."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+def _record_query(execute, sql, params, many, context):
+    # The request's metrics reach worker threads through the context that
+    # sync_to_async copies, not through the connection, which is per thread.
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver: count the connection's queries into the current request."""
+    # First, so that execute_wrapper() blocks, which pop the last wrapper on
+    # exit, never remove it.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+class _Registry:
+    """Per-view counters, summed across requests of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()  # (view, method, status)
+            self.views = {}
+
+    def observe(self, view, method, status, duration, metrics, size, suspects):
+        with self._lock:
+            self.requests[view, method, str(status)] += 1
+            v = self.views.setdefault(view, {
+                'count': 0,
+                'duration': 0.0,
+                'buckets': [0] * len(DURATION_BUCKETS),
+                'queries': 0,
+                'db_seconds': 0.0,
+                'template_seconds': 0.0,
+                'response_bytes': 0,
+                'n_plus_one': 0,
+            })
+            v['count'] += 1
+            v['duration'] += duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    v['buckets'][i] += 1
+            v['queries'] += metrics.queries
+            v['db_seconds'] += metrics.db_seconds
+            v['template_seconds'] += metrics.template_seconds
+            v['response_bytes'] += size or 0
+            v['n_plus_one'] += suspects
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.requests), {view: dict(v, buckets=list(v['buckets'])) for view, v in self.views.items()}
+
+
+registry = _Registry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.BOOKS_METRICS:
+            return self.get_response(request)
+        metrics, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        if not settings.BOOKS_METRICS:
+            return await self.get_response(request)
+        metrics, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    @staticmethod
+    def _start():
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def _finish(self, request, response, metrics, start):
+        duration = time.perf_counter() - start
+        view = _view_name(request)
+        if view == 'metrics':
+            return response
+        size = None if response.streaming else len(response.content)
+        suspects = metrics.duplicates(settings.BOOKS_METRICS_DUPLICATE_THRESHOLD)
+        registry.observe(view, request.method, response.status_code, duration, metrics, size, len(suspects))
+
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_seconds * 1000, 2),
+            'template_ms': round(metrics.template_seconds * 1000, 2),
+            'response_bytes': size,
+        }
+        if suspects:
+            record['n_plus_one'] = [{'sql': sql[:300], 'count': n} for sql, n in suspects]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+
+def instrument_templates():
+    """Time Django template rendering for the current request's metrics."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, '_books_metrics', False):
+        return
+    original = Template.render
+
+    @wraps(original)
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            return original(self, context, request)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - start
+            metrics.rendering = False
+
+    render._books_metrics = True
+    Template.render = render
+
+
+def _labels(**labels):
+    return ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels.items())
+
+
+def render_prometheus():
+    requests, views = registry.snapshot()
+    lines = [
+        '# HELP booktracker_requests_total Requests by view, method and status.',
+        '# TYPE booktracker_requests_total counter',
+    ]
+    for (view, method, status), n in sorted(requests.items()):
+        lines.append(f'booktracker_requests_total{{{_labels(view=view, method=method, status=status)}}} {n}')
+
+    lines += [
+        '# HELP booktracker_request_duration_seconds Request duration by view.',
+        '# TYPE booktracker_request_duration_seconds histogram',
+    ]
+    for view, v in sorted(views.items()):
+        for bound, n in zip(DURATION_BUCKETS, v['buckets']):
+            lines.append(f'booktracker_request_duration_seconds_bucket{{{_labels(view=view, le=bound)}}} {n}')
+        lines.append(f'booktracker_request_duration_seconds_bucket{{{_labels(view=view, le="+Inf")}}} {v["count"]}')
+        lines.append(f'booktracker_request_duration_seconds_sum{{{_labels(view=view)}}} {v["duration"]:.6f}')
+        lines.append(f'booktracker_request_duration_seconds_count{{{_labels(view=view)}}} {v["count"]}')
+
+    totals = (
+        ('db_queries_total', 'SQL queries run by view.', 'queries', '{}'),
+        ('db_duration_seconds_total', 'Time spent in SQL by view.', 'db_seconds', '{:.6f}'),
+        ('template_render_seconds_total', 'Time spent rendering templates by view.', 'template_seconds', '{:.6f}'),
+        ('response_bytes_total', 'Response body bytes by view (streaming responses excluded).',
+         'response_bytes', '{}'),
+        ('n_plus_one_suspects_total', 'Statements repeated within one request, by view.', 'n_plus_one', '{}'),
+    )
+    for name, help_text, key, fmt in totals:
+        lines += [f'# HELP booktracker_{name} {help_text}', f'# TYPE booktracker_{name} counter']
+        for view, v in sorted(views.items()):
+            lines.append(f'booktracker_{name}{{{_labels(view=view)}}} {fmt.format(v[key])}')
+
+    cache_stats = user_cache.stats()
+    lines += [
+        '# HELP booktracker_cache_requests_total Per-user cache lookups by result.',
+        '# TYPE booktracker_cache_requests_total counter',
+        f'booktracker_cache_requests_total{{result="hit"}} {cache_stats["hits"]}',
+        f'booktracker_cache_requests_total{{result="miss"}} {cache_stats["misses"]}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /metrics — Prometheus; Bearer BOOKS_METRICS_TOKEN, or a staff session."""
+    token = settings.BOOKS_METRICS_TOKEN
+    authorized = (
+        bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+    ) or (request.user.is_authenticated and request.user.is_staff)
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:34
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    ReadingSession = apps.get_model('books', 'ReadingSession')
+    sessions = ReadingSession.objects.filter(book=models.OuterRef('pk')).values('book')
+    Book.objects.update(
+        max_end_page=Coalesce(
+            models.Subquery(sessions.annotate(m=models.Max('end_page')).values('m')),
+            0,
+        ),
+        total_minutes=Coalesce(
+            models.Subquery(sessions.annotate(t=models.Sum('duration_minutes')).values('t')),
+            models.Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_alter_readingsession_duration_minutes_decimal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='max_end_page',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='total_minutes',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
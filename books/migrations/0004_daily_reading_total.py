@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:38
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_daily_totals(apps, schema_editor):
+    # DailyReadingTotalQuerySet.rebuild() over each user's whole history; the
+    # historical models have no custom querysets, so the rule is repeated here.
+    DailyReadingTotal = apps.get_model('books', 'DailyReadingTotal')
+    ReadingSession = apps.get_model('books', 'ReadingSession')
+    user_ids = ReadingSession.objects.values_list('book__user_id', flat=True).distinct().order_by()
+    for user_id in list(user_ids):
+        rows = (
+            ReadingSession.objects.filter(book__user_id=user_id)
+            .values('book_id', 'date')
+            .annotate(top=models.Max('end_page'), minutes=models.Sum('duration_minutes'), count=models.Count('id'))
+            .order_by('book_id', 'date')
+        )
+        reached, totals = {}, {}
+        for r in rows:
+            day = totals.get(r['date'])
+            if day is None:
+                day = totals[r['date']] = DailyReadingTotal(
+                    user_id=user_id, date=r['date'], minutes=Decimal('0'), pages=0, sessions=0
+                )
+            previous = reached.get(r['book_id']) or 0
+            day.pages += max(0, r['top'] - previous)
+            day.minutes += Decimal(str(r['minutes'] or 0))
+            day.sessions += r['count']
+            reached[r['book_id']] = max(previous, r['top'])
+        DailyReadingTotal.objects.bulk_create(totals.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_progress_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReadingTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('minutes', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pages', models.IntegerField(default=0)),
+                ('sessions', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='daily_total_user_date')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
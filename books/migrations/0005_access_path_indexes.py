@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_daily_reading_total'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['user', 'status'], name='book_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['user', 'category', '-updated_at'], name='book_user_cat_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='readingsession',
+            index=models.Index(fields=['book', '-date', '-id'], include=('end_page', 'duration_minutes'), name='session_book_date_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:42
+
+import unicodedata
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+import books.search
+
+
+def _normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def populate_search_text(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    books = list(Book.objects.only('id', 'title', 'author'))
+    for book in books:
+        book.search_text = _normalize(f'{book.title} {book.author}')
+    Book.objects.bulk_update(books, ['search_text'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=401),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        # Both are no-ops off PostgreSQL; SQLite gets an FTS5 table on post_migrate
+        # (books/search.py).
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='book',
+            index=books.search.TrigramIndex(fields=['search_text'], name='book_search_trgm_idx'),
+        ),
+    ]
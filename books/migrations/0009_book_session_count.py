@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:05
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_session_count(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    ReadingSession = apps.get_model('books', 'ReadingSession')
+    sessions = ReadingSession.objects.filter(book=models.OuterRef('pk')).values('book')
+    Book.objects.update(
+        session_count=Coalesce(models.Subquery(sessions.annotate(c=models.Count('pk')).values('c')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_sync_timestamps_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='session_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_session_count, migrations.RunPython.noop),
+    ]
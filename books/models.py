@@ -1,12 +1,18 @@
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .cache import invalidate_all, invalidate_users
+from .search import TrigramIndex, book_search_text
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -20,6 +26,95 @@ class Category(models.Model):
             from django.utils.text import slugify
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        invalidate_all()
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic():
+            # SET_NULL clears Book.category with a plain UPDATE that leaves
+            # updated_at alone; bump it so /api/sync/ sends those books again.
+            self.books.update(updated_at=timezone.now())
+            result = super().delete(*args, **kwargs)
+            Tombstone.record('category', [(None, pk)])
+        invalidate_all()
+        return result
+
+class BookQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.search_text = book_search_text(obj.title, obj.author)
+        objs = super().bulk_create(objs, *args, **kwargs)
+        invalidate_users(obj.user_id for obj in objs)
+        return objs
+
+    def delete(self):
+        rows = list(self.values_list('user_id', 'pk').order_by())
+        spans = _session_spans(book__in=self.values('pk'))
+        result = super().delete()
+        _rebuild_spans(spans)
+        Tombstone.record('book', rows)
+        invalidate_users({user_id for user_id, _ in rows})
+        return result
+
+    delete.alters_data = True
+
+    def refresh_progress(self, touch=True, status=True):
+        """Recompute max_end_page / total_minutes / session_count from the sessions in one UPDATE.
+
+        ``touch`` also bumps updated_at, which the API's ETags rely on to see
+        session changes; ``status`` also rederives the status (_status_for).
+        This runs because the books' sessions just changed, so a book left
+        without sessions goes back to PENDING; refresh_status() differs there.
+        """
+        sessions = ReadingSession.objects.filter(book=models.OuterRef('pk')).values('book')
+        max_page = _max_end_page(sessions)
+        # App clock, like auto_now: SQLite's Now() stores milliseconds only and
+        # would compare below the microsecond timestamps in keyset cursors.
+        extra = {'updated_at': timezone.now()} if touch else {}
+        if status:
+            # SET expressions see the old row, so the status reads the subquery too.
+            extra['status'] = _status_for(max_page)
+        return self.update(
+            **extra,
+            max_end_page=max_page,
+            total_minutes=Coalesce(
+                models.Subquery(sessions.annotate(t=models.Sum('duration_minutes')).values('t')),
+                models.Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            session_count=Coalesce(models.Subquery(sessions.annotate(c=models.Count('pk')).values('c')), 0),
+        )
+
+    def refresh_status(self):
+        """Rederive status from the sessions, in one UPDATE; returns how many books changed.
+
+        Reads the sessions rather than the counters, so stale counters do not
+        matter. Unlike the session write path (refresh_progress), books without
+        sessions keep their status: a sweep cannot tell a book whose last
+        session was deleted (already reset by that delete) from one that never
+        had sessions, whose status was set by hand or by an import.
+        """
+        sessions = ReadingSession.objects.filter(book=models.OuterRef('pk')).values('book')
+        status = _status_for(_max_end_page(sessions))
+        # updated_at as in refresh_progress(): ETags and /api/sync/ must see the change.
+        return self.filter(models.Exists(sessions)).exclude(status=status).update(
+            status=status, updated_at=timezone.now()
+        )
+
+
+def _max_end_page(sessions):
+    return Coalesce(models.Subquery(sessions.annotate(m=models.Max('end_page')).values('m')), 0)
+
+
+def _status_for(max_page):
+    """The status rule: COMPLETED at the last page, READING once started, else PENDING."""
+    return models.Case(
+        models.When(GreaterThanOrEqual(max_page, models.F('total_pages')), then=models.Value('COMPLETED')),
+        models.When(GreaterThan(max_page, 0), then=models.Value('READING')),
+        default=models.Value('PENDING'),
+    )
+
 
 class Book(models.Model):
     STATUS_CHOICES = [
@@ -37,14 +132,62 @@ class Book(models.Model):
     cover_url = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from ReadingSession; kept in sync by ReadingSession.save/delete
+    # and ReadingSessionQuerySet. Rebuild with `manage.py rebuild_progress`.
+    max_end_page = models.IntegerField(default=0, editable=False)
+    total_minutes = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    session_count = models.IntegerField(default=0, editable=False)
+    # Accent/case-folded "title author", indexed for search (see books/search.py).
+    search_text = models.CharField(max_length=401, blank=True, default='', editable=False)
+
+    objects = BookQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # book_list / BookViewSet: status tabs and the counters.
+            models.Index(fields=['user', 'status'], name='book_user_status_idx'),
+            # book_list / BookViewSet default ordering within a user's library.
+            models.Index(fields=['user', 'category', '-updated_at'], name='book_user_cat_updated_idx'),
+            # /api/sync/: books changed since a cursor.
+            models.Index(fields=['user', 'updated_at'], name='book_user_updated_idx'),
+            # Book search (books/search.py); PostgreSQL only.
+            TrigramIndex(fields=['search_text'], name='book_search_trgm_idx'),
+        ]
+
+    PROGRESS_FIELDS = ('max_end_page', 'total_minutes', 'session_count')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.search_text = book_search_text(self.title, self.author)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'title', 'author'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        # The counters are owned by refresh_progress(); never overwrite them from a
+        # possibly stale instance when saving an existing row.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.PROGRESS_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        invalidate_users([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        # The cascade removes the sessions without going through
+        # ReadingSession.delete, so the daily rollup is fixed up here.
+        spans = _session_spans(book=self)
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        _rebuild_spans(spans)
+        Tombstone.record('book', [(self.user_id, pk)])
+        invalidate_users([self.user_id])
+        return result
+
     @property
     def pages_read(self):
-        # Return the highest end_page from sessions, or 0 if no sessions
-        return self.readingsession_set.aggregate(max_page=models.Max('end_page'))['max_page'] or 0
+        return self.max_end_page or 0
 
     @property
     def progress_percentage(self):
@@ -58,7 +201,7 @@ class Book(models.Model):
 
     @property
     def total_time_read(self):
-        raw = self.readingsession_set.aggregate(total=models.Sum('duration_minutes'))['total']
+        raw = self.total_minutes
         if raw is None:
             minutes = Decimal('0')
         else:
@@ -78,6 +221,81 @@ class Book(models.Model):
             return f'{hours}h {fmt_mins(mins)}m'
         return f'{fmt_mins(mins)}m'
 
+def _as_date(value):
+    # ReadingSession.date defaults to timezone.now, so unsaved-then-saved
+    # instances may still hold a datetime.
+    return ReadingSession._meta.get_field('date').to_python(value)
+
+
+def sessions_changed(keys):
+    """Propagate session writes to the derived data.
+
+    ``keys`` are the (book_id, date) pairs touched by the write, both before
+    and after it, so moved sessions refresh their old book/day too.
+    """
+    keys = {(book_id, _as_date(day)) for book_id, day in keys if book_id is not None}
+    if not keys:
+        return
+    owners = dict(
+        Book.objects.filter(pk__in={book_id for book_id, _ in keys}).values_list('pk', 'user_id')
+    )
+    Book.objects.filter(pk__in=owners).refresh_progress()
+    DailyReadingTotal.objects.refresh_for_books(keys, owners)
+    invalidate_users(owners.values())
+
+
+def _session_spans(**filters):
+    """(user_id, first date, last date) of the sessions matching ``filters``."""
+    return list(
+        ReadingSession.objects.filter(**filters)
+        .values('book__user_id')
+        .annotate(start=models.Min('date'), end=models.Max('date'))
+        .values_list('book__user_id', 'start', 'end')
+        .order_by()
+    )
+
+
+def _rebuild_spans(spans):
+    for user_id, start, end in spans:
+        DailyReadingTotal.objects.rebuild(user_id, start, end)
+
+
+class ReadingSessionQuerySet(models.QuerySet):
+    """Keeps the derived per-book and per-day data in sync for bulk operations."""
+
+    def _keys(self):
+        return set(self.values_list('book_id', 'date').distinct())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        sessions_changed((obj.book_id, obj.date) for obj in objs)
+        return objs
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        keys = self._keys()
+        if {'book', 'book_id', 'date'} & kwargs.keys():
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            keys |= ReadingSession.objects.filter(pk__in=pks)._keys()
+        else:
+            rows = super().update(**kwargs)
+        sessions_changed(keys)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        keys = self._keys()
+        rows = list(self.values_list('book__user_id', 'pk').order_by())
+        result = super().delete()
+        sessions_changed(keys)
+        Tombstone.record('session', rows)
+        return result
+
+    delete.alters_data = True
+
+
 class ReadingSession(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     end_page = models.IntegerField(help_text="Página hasta la que llegaste")
@@ -89,6 +307,171 @@ class ReadingSession(models.Model):
     )
     date = models.DateField(default=timezone.now)
     notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ReadingSessionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # /api/sync/: sessions changed since a cursor.
+            models.Index(fields=['updated_at'], name='session_updated_idx'),
+            # Session history ordering, keyset pagination and the per-book/day
+            # aggregates. INCLUDE makes it covering on PostgreSQL (ignored elsewhere).
+            models.Index(
+                fields=['book', '-date', '-id'],
+                name='session_book_date_idx',
+                include=['end_page', 'duration_minutes'],
+            ),
+        ]
 
     def __str__(self):
         return f"{self.book.title} - Pág {self.end_page} - {self.date}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_key = (instance.__dict__.get('book_id'), instance.__dict__.get('date'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        keys = {(self.book_id, self.date), getattr(self, '_loaded_key', (None, None))}
+        self._loaded_key = (self.book_id, _as_date(self.date))
+        self._changed(keys)
+
+    def delete(self, *args, **kwargs):
+        key = (self.book_id, self.date)
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        self._changed({key})
+        if ReadingSession.book.is_cached(self):
+            owner = self.book.user_id
+        else:
+            owner = Book.objects.filter(pk=key[0]).values_list('user_id', flat=True).first()
+        Tombstone.record('session', [(owner, pk)])
+        return result
+
+    def _changed(self, keys):
+        sessions_changed(keys)
+        # Keep an already-loaded book instance consistent with the new counters.
+        if ReadingSession.book.is_cached(self) and self.book.pk in {book_id for book_id, _ in keys}:
+            self.book.refresh_from_db(fields=[*Book.PROGRESS_FIELDS, 'status', 'updated_at'])
+
+
+class DailyReadingTotalQuerySet(models.QuerySet):
+    def refresh_for_books(self, keys, owners):
+        """Rebuild the days touched by ``keys`` ((book_id, date) pairs).
+
+        ``owners`` maps book id to user id.
+        """
+        touched = {}
+        for book_id, day in keys:
+            if book_id in owners:
+                book_ids, days = touched.setdefault(owners[book_id], (set(), set()))
+                book_ids.add(book_id)
+                days.add(day)
+        for user_id, (book_ids, days) in touched.items():
+            # Pages read on later days depend on the running max page of these
+            # books, so the range extends to their latest session.
+            latest = ReadingSession.objects.filter(book_id__in=book_ids).aggregate(d=models.Max('date'))['d']
+            self.rebuild(user_id, min(days), max(days | {latest} - {None}))
+
+    def rebuild(self, user_id, start, end):
+        """Recompute the rollup rows of ``user_id`` between two dates, inclusive."""
+        rows = (
+            ReadingSession.objects.filter(book__user_id=user_id, date__range=(start, end))
+            .values('book_id', 'date')
+            .annotate(
+                top=models.Max('end_page'),
+                minutes=models.Sum('duration_minutes'),
+                count=models.Count('id'),
+            )
+            .order_by('book_id', 'date')
+        )
+        rows = list(rows)
+        reached = dict(
+            ReadingSession.objects.filter(book_id__in={r['book_id'] for r in rows}, date__lt=start)
+            .values('book_id')
+            .annotate(m=models.Max('end_page'))
+            .values_list('book_id', 'm')
+        )
+        totals = {}
+        for r in rows:
+            day = totals.get(r['date'])
+            if day is None:
+                day = totals[r['date']] = DailyReadingTotal(
+                    user_id=user_id, date=r['date'], minutes=Decimal('0'), pages=0, sessions=0
+                )
+            previous = reached.get(r['book_id']) or 0
+            day.pages += max(0, r['top'] - previous)
+            day.minutes += Decimal(str(r['minutes'] or 0))
+            day.sessions += r['count']
+            reached[r['book_id']] = max(previous, r['top'])
+
+        with transaction.atomic():
+            self.filter(user_id=user_id, date__range=(start, end)).exclude(date__in=totals).delete()
+            self.bulk_create(
+                totals.values(),
+                update_conflicts=True,
+                unique_fields=['user', 'date'],
+                update_fields=['minutes', 'pages', 'sessions'],
+            )
+
+
+class DailyReadingTotal(models.Model):
+    """Per-user, per-day rollup of ReadingSession rows (see DailyReadingTotalQuerySet).
+
+    ``pages`` counts progress, not end pages: for each book, how far the max
+    end_page advanced over the best page reached on earlier days.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_totals')
+    date = models.DateField()
+    minutes = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pages = models.IntegerField(default=0)
+    sessions = models.IntegerField(default=0)
+
+    objects = DailyReadingTotalQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='daily_total_user_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.date} - {self.minutes} min"
+
+
+class Tombstone(models.Model):
+    """A deleted Book, ReadingSession or Category, so /api/sync/ can report it.
+
+    Written by the delete() methods of those models and their querysets.
+    Deleting a book records the book only: its sessions go with it.
+    Categories are shared, so their tombstones have no user.
+    """
+
+    MODEL_CHOICES = [('book', 'Book'), ('session', 'ReadingSession'), ('category', 'Category')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+')
+    model = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} - {self.deleted_at}"
+
+    @classmethod
+    def record(cls, model, rows):
+        """Tombstones for ``rows``, (user_id, pk) pairs of deleted ``model`` rows."""
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, model=model, object_id=pk, deleted_at=now) for user_id, pk in rows],
+            batch_size=1000,
+        )
@@ -0,0 +1,189 @@
+import json
+import operator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _cursor_default(value):
+    # Full precision on purpose: DjangoJSONEncoder truncates microseconds,
+    # which would skip rows that share the same millisecond.
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a composite ordering.
+
+    The cursor stores the ordering values of the last row of the page and the
+    next page is fetched with a row-value comparison against them, so page N
+    costs the same as page 1. The ordering must end in a unique field (id).
+    NULLs always sort last, on every backend.
+    """
+
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self._order_by())
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(self._typed(queryset, position)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_ordering(self, queryset):
+        return self.ordering
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def next_cursor(self):
+        """The cursor of the page after this one, or None on the last page."""
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor([self._value(last, field.lstrip('-')) for field in self.ordering])
+
+    def get_next_link(self):
+        cursor = self.next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, default=_cursor_default, separators=(',', ':'))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            position = json.loads(raw)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _typed(self, queryset, position):
+        """The cursor values converted by their ordering fields; NotFound if one does not fit."""
+        typed = []
+        try:
+            for field, value in zip(self.ordering, position):
+                if value is None:
+                    typed.append(None)
+                    continue
+                if isinstance(value, (dict, list, bool)):
+                    raise ValidationError(value)
+                typed.append(self._field(queryset, field.lstrip('-')).to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return typed
+
+    @staticmethod
+    def _field(queryset, path):
+        if path in queryset.query.annotations:
+            return queryset.query.annotations[path].output_field
+        model = queryset.model
+        *relations, name = path.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def _order_by(self):
+        exprs = []
+        for field in self.ordering:
+            if field.startswith('-'):
+                exprs.append(F(field[1:]).desc(nulls_last=True))
+            else:
+                exprs.append(F(field).asc(nulls_last=True))
+        return exprs
+
+    def _after(self, position):
+        # (f1, f2, ...) > (v1, v2, ...) expanded into OR-of-ANDs, since the
+        # directions are mixed and NULLs sort last.
+        branches = []
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            if value is not None:
+                lookup = 'lt' if field.startswith('-') else 'gt'
+                branches.append(equal & (Q(**{f'{name}__{lookup}': value}) | Q(**{f'{name}__isnull': True})))
+                equal &= Q(**{name: value})
+            else:
+                equal &= Q(**{f'{name}__isnull': True})
+        return reduce(operator.or_, branches, Q(pk__in=[]))
+
+    @staticmethod
+    def _value(obj, path):
+        for attr in path.split('__'):
+            if obj is None:
+                return None
+            obj = getattr(obj, attr)
+        return obj
+
+
+class BookPagination(KeysetPagination):
+    ordering = ('category__name', '-updated_at', '-id')
+
+    def get_ordering(self, queryset):
+        # Searches (books.search) are paged by relevance instead.
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', '-id')
+        return self.ordering
+
+
+class ReadingSessionPagination(KeysetPagination):
+    ordering = ('-date', '-id')
+
+
+class SessionHistoryPagination(ReadingSessionPagination):
+    """The session history of the book_detail page, loaded page by page."""
+
+    page_size = 20
+    page_size_query_param = None
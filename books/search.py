@@ -0,0 +1,143 @@
+"""
+Book search over the normalized ``Book.search_text`` column.
+
+- PostgreSQL: pg_trgm GIN index (``TrigramIndex`` on Book). Substring matches and
+  typo-tolerant word similarity (``%>``) both use the index; ranked by
+  TrigramWordSimilarity.
+- SQLite: FTS5 external-content table kept in sync by triggers, with prefix
+  queries ranked by bm25. Installed on post_migrate (see apps.py) because
+  SQLite table rebuilds during migrations drop triggers.
+- Anything else: icontains on the normalized column.
+
+Accents and case are folded on both sides, so "antifragil" finds "Antifrágil".
+"""
+
+import unicodedata
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import OperationalError, connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'books_book_fts'
+
+
+class TrigramIndex(GinIndex):
+    """
+    GIN ``gin_trgm_ops`` index on PostgreSQL; no SQL on other backends, which
+    search through FTS5 or a plain scan instead.
+    """
+
+    def __init__(self, *expressions, **kwargs):
+        kwargs.setdefault('opclasses', ['gin_trgm_ops'])
+        super().__init__(*expressions, **kwargs)
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return ''
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return ''
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+def normalize(text):
+    """Lowercase, accent-free, single-spaced version of ``text``."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def book_search_text(title, author):
+    return normalize(f'{title} {author}')
+
+
+def search_books(queryset, query):
+    """Filter ``queryset`` to books matching ``query`` and annotate ``search_rank``."""
+    term = normalize(query)
+    if not term:
+        return queryset
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(queryset, term)
+    if connection.vendor == 'sqlite' and _has_fts(connection):
+        return _search_sqlite_fts(queryset, term)
+    return queryset.filter(search_text__contains=term).annotate(
+        search_rank=Value(1.0, output_field=FloatField())
+    )
+
+
+def _search_postgresql(queryset, term):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    return queryset.annotate(search_rank=TrigramWordSimilarity(term, 'search_text')).filter(
+        Q(search_text__contains=term) | Q(search_text__trigram_word_similar=term)
+    )
+
+
+def _search_sqlite_fts(queryset, term):
+    # Every word is a quoted prefix query, so partial input ("antifr") matches
+    # while keystrokes can never produce FTS5 syntax errors.
+    match = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in term.split())
+    table = queryset.model._meta.db_table
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = "{table}"."id"',
+            [match],
+            output_field=FloatField(),
+        )
+    )
+
+
+def _has_fts(connection):
+    if getattr(connection, '_books_has_fts', None) is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            connection._books_has_fts = cursor.fetchone() is not None
+    return connection._books_has_fts
+
+
+def install_sqlite_fts(using='default', **kwargs):
+    """(Re)create the FTS5 table and its sync triggers; no-op outside SQLite."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        columns = {c.name for c in connection.introspection.get_table_description(cursor, 'books_book')}
+        if 'search_text' not in columns:
+            return  # migrated back past 0006
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{FTS_TABLE}_%'])
+        triggers = {row[0] for row in cursor.fetchall()}
+        if triggers == {f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}:
+            return
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"search_text, content='books_book', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5: search_books() falls back to LIKE.
+            connection._books_has_fts = False
+            return
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON books_book BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON books_book BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_text ON books_book BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        # Triggers were missing, so the index may have drifted: rebuild it.
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    connection._books_has_fts = True
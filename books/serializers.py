@@ -1,20 +1,9 @@
-from django.db.models import Max
+from django.db import transaction
 from rest_framework import serializers
 
 from .models import Book, Category, ReadingSession
 
 
-def refresh_book_status(book):
-    max_page = book.readingsession_set.aggregate(m=Max('end_page'))['m'] or 0
-    if max_page >= book.total_pages:
-        book.status = 'COMPLETED'
-    elif max_page > 0:
-        book.status = 'READING'
-    else:
-        book.status = 'PENDING'
-    book.save(update_fields=['status', 'updated_at'])
-
-
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -39,19 +28,105 @@ class ReadingSessionSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         book = self.context['book']
-        session = ReadingSession.objects.create(book=book, **validated_data)
-        refresh_book_status(book)
-        return session
+        # Counters and status follow in ReadingSession.save (sessions_changed).
+        return ReadingSession.objects.create(book=book, **validated_data)
 
     def update(self, instance, validated_data):
         for k, v in validated_data.items():
             setattr(instance, k, v)
         instance.save()
-        refresh_book_status(instance.book)
         return instance
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BulkReadingSessionListSerializer(serializers.ListSerializer):
+    """Validates a whole import against the owner's books with one query."""
+
+    def to_internal_value(self, data):
+        # Checked here rather than in validate() so errors keep DRF's
+        # one-entry-per-item list shape.
+        attrs = super().to_internal_value(data)
+        user = self.context['request'].user
+        total_pages = dict(
+            Book.objects.filter(user=user, pk__in={item['book_id'] for item in attrs})
+            .values_list('pk', 'total_pages')
+        )
+        errors = []
+        for item in attrs:
+            if item['book_id'] not in total_pages:
+                errors.append({'book': ['Libro no encontrado.']})
+            elif item['end_page'] > total_pages[item['book_id']]:
+                errors.append({'end_page': [
+                    f'No puede ser mayor al total de páginas ({total_pages[item["book_id"]]}).'
+                ]})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        # One transaction; bulk_create refreshes counters and status of every touched book at once.
+        with transaction.atomic():
+            return ReadingSession.objects.bulk_create(
+                [ReadingSession(**item) for item in validated_data], batch_size=1000
+            )
+
+
+class BulkReadingSessionSerializer(serializers.ModelSerializer):
+    book = serializers.IntegerField(source='book_id')
+
+    class Meta:
+        model = ReadingSession
+        fields = ['id', 'book', 'end_page', 'duration_minutes', 'date', 'notes']
+        read_only_fields = ['id']
+        list_serializer_class = BulkReadingSessionListSerializer
+
+
+class SparseFieldsMixin:
+    """Serialize only the fields picked with ?fields= / ?omit= on GET requests.
+
+    Unpicked fields are removed before serialization, so computed ones are
+    never evaluated. SOURCE_COLUMNS maps a serializer field to the model
+    columns it reads (default: the field name), so the queryset can be cut
+    down to match with trim_queryset().
+    """
+
+    SOURCE_COLUMNS = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method in ('GET', 'HEAD'):
+            picked = self.picked_fields(request.query_params)
+            for name in [name for name in self.fields if name not in picked]:
+                self.fields.pop(name)
+
+    @classmethod
+    def picked_fields(cls, query_params):
+        picked = list(cls.Meta.fields)
+        for param in ('fields', 'omit'):
+            names = {n.strip() for n in query_params.get(param, '').split(',') if n.strip()}
+            unknown = names - set(cls.Meta.fields)
+            if unknown:
+                raise serializers.ValidationError({param: [f'Campos desconocidos: {", ".join(sorted(unknown))}.']})
+            if names:
+                picked = [n for n in picked if (n in names) == (param == 'fields')]
+        return picked
+
+    @classmethod
+    def trim_queryset(cls, queryset, query_params, keep=()):
+        """``queryset`` loading only the picked fields' columns, plus ``keep``."""
+        columns = set(keep)
+        for name in cls.picked_fields(query_params):
+            columns.update(cls.SOURCE_COLUMNS.get(name, (name,)))
+        related = {c.split('__')[0] for c in columns if '__' in c}
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     pages_read = serializers.IntegerField(read_only=True)
     progress_percentage = serializers.IntegerField(read_only=True)
     pages_remaining = serializers.IntegerField(read_only=True)
@@ -78,7 +153,23 @@ class BookSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
 
+    SOURCE_COLUMNS = {
+        'category_name': ('category__name',),
+        'pages_read': ('max_end_page',),
+        'progress_percentage': ('max_end_page', 'total_pages'),
+        'pages_remaining': ('max_end_page', 'total_pages'),
+        'total_time_read': ('total_minutes',),
+    }
+
     def validate_total_pages(self, value):
         if value < 0:
             raise serializers.ValidationError('Debe ser mayor o igual a 0.')
         return value
+
+
+class BookCompactSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """GET /api/books/?compact=1: enough for widgets and sync clients."""
+
+    class Meta:
+        model = Book
+        fields = ['id', 'title', 'status', 'updated_at']
@@ -0,0 +1,74 @@
+"""Reading statistics computed with one aggregate query per family of counters."""
+
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Book, DailyReadingTotal
+
+PERIODS = ('today', 'yesterday', 'week', 'week_prev', 'month', 'month_prev')
+
+
+def period_ranges(today=None):
+    """Inclusive (start, end) dates for every period in PERIODS."""
+    today = today or timezone.localdate()
+    yesterday = today - timedelta(days=1)
+
+    monday_this = today - timedelta(days=today.weekday())
+    sunday_this = monday_this + timedelta(days=6)
+    monday_prev = monday_this - timedelta(days=7)
+    sunday_prev = monday_this - timedelta(days=1)
+
+    first_this_month = today.replace(day=1)
+    _, last_day_m = monthrange(today.year, today.month)
+    last_this_month = today.replace(day=last_day_m)
+
+    if first_this_month.month == 1:
+        prev_m_year = first_this_month.year - 1
+        prev_m_month = 12
+    else:
+        prev_m_year = first_this_month.year
+        prev_m_month = first_this_month.month - 1
+
+    first_prev_month = date(prev_m_year, prev_m_month, 1)
+    _, last_prev_m = monthrange(prev_m_year, prev_m_month)
+    last_prev_month = date(prev_m_year, prev_m_month, last_prev_m)
+
+    return {
+        'today': (today, today),
+        'yesterday': (yesterday, yesterday),
+        'week': (monday_this, sunday_this),
+        'week_prev': (monday_prev, sunday_prev),
+        'month': (first_this_month, last_this_month),
+        'month_prev': (first_prev_month, last_prev_month),
+    }
+
+
+def minutes_by_period(user, ranges):
+    """{period: Decimal minutes} for ``ranges`` in a single query over the rollup."""
+    start = min(s for s, _ in ranges.values())
+    end = max(e for _, e in ranges.values())
+    aggregates = {
+        name: Coalesce(
+            Sum('minutes', filter=Q(date__range=bounds)),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+        for name, bounds in ranges.items()
+    }
+    totals = DailyReadingTotal.objects.filter(user=user, date__range=(start, end)).aggregate(**aggregates)
+    return {name: Decimal(str(value)) for name, value in totals.items()}
+
+
+def status_counts(user):
+    """Total / completed / reading / pending book counts in a single query."""
+    return Book.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='COMPLETED')),
+        reading=Count('id', filter=Q(status='READING')),
+        pending=Count('id', filter=Q(status='PENDING')),
+    )
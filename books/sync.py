@@ -0,0 +1,141 @@
+"""
+Incremental sync for offline clients (GET /api/sync/).
+
+A response carries a token: an opaque encoding of the server time when it
+was built. Sent back as ?since=<token>, it selects the books, sessions and
+categories whose updated_at is later, plus the ids deleted since then (from
+Tombstone); without it the whole library is returned. Both are paged: each
+page holds up to ``page_size`` rows of each kind (and deleted ids), walked by
+id with keyset cursors, and ``next`` links the following page (null on the
+last one). Every page carries the token of the first, so rows written while
+the client pages through come back in its next delta. Clients upsert the
+rows and drop the deleted ids; a deleted book takes its sessions with it.
+
+Tokens older than BOOKS_SYNC_TOMBSTONE_DAYS are refused, since the
+tombstones they would need may have been pruned (``prune_tombstones``).
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Book, Category, ReadingSession, Tombstone
+from .pagination import KeysetPagination
+from .serializers import BookSerializer, CategorySerializer, ReadingSessionSerializer
+
+# Rows written by transactions still open when a token was issued can carry
+# an earlier updated_at; re-sending this window catches them (upserts are
+# idempotent, so repeats are harmless).
+OVERLAP = timedelta(seconds=2)
+
+_DELETED_KEYS = {'book': 'books', 'session': 'sessions', 'category': 'categories'}
+
+
+class TokenExpired(Exception):
+    pass
+
+
+class SyncPagination(KeysetPagination):
+    """One kind of row of a sync, by id; each kind has its own cursor parameter."""
+
+    ordering = ('id',)
+    page_size = 500
+    max_page_size = 2000
+
+    def __init__(self, key):
+        self.cursor_query_param = f'{key}_cursor'
+
+    def last_cursor(self):
+        """The cursor after the last row of this page (None if empty), even on the last page."""
+        return self.encode_cursor([self.page[-1].pk]) if self.page else None
+
+
+def encode_token(moment):
+    return urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """The datetime in ``token``; ValueError if malformed, TokenExpired if too old."""
+    try:
+        moment = datetime.fromisoformat(urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError(token)
+    if timezone.is_naive(moment):
+        raise ValueError(token)
+    if moment < timezone.now() - timedelta(days=settings.BOOKS_SYNC_TOMBSTONE_DAYS):
+        raise TokenExpired(token)
+    return moment
+
+
+def changes(request, since=None, started=None):
+    """Rows of ``request.user`` changed after ``since`` (a datetime), or all of them.
+
+    Paged with the cursors in ``request``'s query string; ``started`` is the
+    time of the first page.
+    """
+    user = request.user
+    books = Book.objects.filter(user=user).select_related('category')
+    sessions = ReadingSession.objects.filter(book__user=user)
+    categories = Category.objects.all()
+    tombstones = None
+
+    if since is not None:
+        after = since - OVERLAP
+        books = books.filter(updated_at__gt=after)
+        sessions = sessions.filter(updated_at__gt=after)
+        categories = categories.filter(updated_at__gt=after)
+        tombstones = Tombstone.objects.filter(
+            Q(user=user) | Q(user__isnull=True), deleted_at__gt=after
+        ).only('model', 'object_id')
+
+    return _page(request, started or timezone.now(), {
+        'books': (books, BookSerializer),
+        'sessions': (sessions, ReadingSessionSerializer),
+        'categories': (categories, CategorySerializer),
+    }, tombstones)
+
+
+def _page(request, started, kinds, tombstones):
+    token = encode_token(started)
+    payload = {'token': token, 'full': tombstones is None}
+    url = replace_query_param(request.build_absolute_uri(), 'started', token)
+    more = False
+    paginators = []
+    for key, (queryset, serializer_class) in kinds.items():
+        paginator = SyncPagination(key)
+        payload[key] = serializer_class(paginator.paginate_queryset(queryset, request), many=True).data
+        paginators.append(paginator)
+
+    deleted = {key: [] for key in _DELETED_KEYS.values()}
+    if tombstones is not None:
+        paginator = SyncPagination('deleted')
+        for tombstone in paginator.paginate_queryset(tombstones, request):
+            deleted[_DELETED_KEYS[tombstone.model]].append(tombstone.object_id)
+        paginators.append(paginator)
+    payload['deleted'] = deleted
+
+    for paginator in paginators:
+        more = more or paginator.has_next
+        # A finished kind keeps its cursor, so later pages stay empty for it.
+        cursor = paginator.last_cursor()
+        if cursor is not None:
+            url = replace_query_param(url, paginator.cursor_query_param, cursor)
+    payload['next'] = url if more else None
+    return payload
+
+
+def prune_tombstones(batch_size=5000):
+    """Delete tombstones past BOOKS_SYNC_TOMBSTONE_DAYS; returns how many."""
+    expired = Tombstone.objects.filter(
+        deleted_at__lt=timezone.now() - timedelta(days=settings.BOOKS_SYNC_TOMBSTONE_DAYS)
+    ).order_by()
+    deleted = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += Tombstone.objects.filter(pk__in=pks).delete()[0]
@@ -1,3 +1,1365 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection, models
+from django.db.models import F
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase as DjangoTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from . import authentication, benchmarks, cache as user_cache, covers, deletion, metrics, search, stats, sync
+from .importer import import_books
+from .models import Book, Category, DailyReadingTotal, ReadingSession, Tombstone
+from .pagination import KeysetPagination
+
+# One log line per request is noise in test output; assertLogs still sees them.
+logging.getLogger('books.metrics').setLevel(logging.CRITICAL)
+
+
+class TestCase(DjangoTestCase):
+    def setUp(self):
+        # Test databases reuse primary keys, so per-user cache keys would collide.
+        cache.clear()
+        authentication._cache.clear()
+
+
+class BookProgressCountersTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.book = Book.objects.create(user=self.user, title='Meditaciones', author='Marco Aurelio', total_pages=256)
+
+    def _reload(self):
+        return Book.objects.get(pk=self.book.pk)
+
+    def test_counters_follow_session_writes(self):
+        s1 = ReadingSession.objects.create(book=self.book, end_page=40, duration_minutes=Decimal('30'))
+        ReadingSession.objects.create(book=self.book, end_page=90, duration_minutes=Decimal('12.5'))
+        book = self._reload()
+        self.assertEqual(book.max_end_page, 90)
+        self.assertEqual(book.total_minutes, Decimal('42.5'))
+
+        s1.end_page = 120
+        s1.save()
+        self.assertEqual(self._reload().max_end_page, 120)
+
+        s1.delete()
+        book = self._reload()
+        self.assertEqual(book.max_end_page, 90)
+        self.assertEqual(book.total_minutes, Decimal('12.5'))
+
+    def test_counters_follow_bulk_operations(self):
+        ReadingSession.objects.bulk_create([
+            ReadingSession(book=self.book, end_page=p, duration_minutes=10, date=date(2026, 1, p))
+            for p in range(1, 6)
+        ])
+        self.assertEqual(self._reload().max_end_page, 5)
+
+        ReadingSession.objects.filter(book=self.book).update(duration_minutes=20)
+        self.assertEqual(self._reload().total_minutes, Decimal('100'))
+
+        ReadingSession.objects.filter(book=self.book).delete()
+        book = self._reload()
+        self.assertEqual((book.max_end_page, book.total_minutes), (0, Decimal('0')))
+
+    def test_properties_do_not_query(self):
+        ReadingSession.objects.create(book=self.book, end_page=128, duration_minutes=75)
+        book = self._reload()
+        with self.assertNumQueries(0):
+            self.assertEqual(book.pages_read, 128)
+            self.assertEqual(book.progress_percentage, 50)
+            self.assertEqual(book.pages_remaining, 128)
+            self.assertEqual(book.total_time_read, '1h 15m')
+
+    def test_stale_book_save_keeps_counters(self):
+        stale = self._reload()
+        ReadingSession.objects.create(book=self.book, end_page=60)
+        stale.title = 'Meditaciones (ed. Gredos)'
+        stale.save()
+        self.assertEqual(self._reload().max_end_page, 60)
+
+    def test_rebuild_progress_command(self):
+        ReadingSession.objects.create(book=self.book, end_page=60, duration_minutes=5)
+        Book.objects.filter(pk=self.book.pk).update(max_end_page=0, total_minutes=0)
+        call_command('rebuild_progress', stdout=StringIO())
+        book = self._reload()
+        self.assertEqual((book.max_end_page, book.total_minutes), (60, Decimal('5')))
+
+
+class BookListQueryCountTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+
+    def _add_books(self, n):
+        for i in range(n):
+            book = Book.objects.create(user=self.user, title=f'Libro {i}', author='Autor', total_pages=100)
+            ReadingSession.objects.create(book=book, end_page=10 + i, duration_minutes=15)
+
+    def _list_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx)
+
+    def test_book_list_and_api_queries_do_not_grow(self):
+        self._add_books(2)
+        html_small, api_small = self._list_queries('/'), self._list_queries('/api/books/')
+        self._add_books(20)
+        self.assertEqual(self._list_queries('/'), html_small)
+        self.assertEqual(self._list_queries('/api/books/'), api_small)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+
+    def _walk(self, url):
+        ids, pages = [], 0
+        while url:
+            payload = self.client.get(url).json()
+            ids += [row['id'] for row in payload['results']]
+            url, pages = payload['next'], pages + 1
+        return ids, pages
+
+    def test_books_walk_every_row_once_in_order(self):
+        ficcion = Category.objects.create(name='Ficción')
+        ensayo = Category.objects.create(name='Ensayo')
+        for i in range(7):
+            Book.objects.create(user=self.user, title=f'Libro {i}', author='A', category=(ficcion, ensayo, None)[i % 3])
+        # Ties on updated_at must still be split by id.
+        Book.objects.update(updated_at=timezone.now())
+
+        ids, pages = self._walk('/api/books/?page_size=2')
+        expected = list(
+            Book.objects.order_by(F('category__name').asc(nulls_last=True), '-updated_at', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+
+    def test_sessions_walk_and_page_size_bound(self):
+        book = Book.objects.create(user=self.user, title='Libro', author='A', total_pages=500)
+        for i in range(5):
+            ReadingSession.objects.create(book=book, end_page=i + 1, date=date(2026, 1, 1 + i // 2))
+        ids, _ = self._walk(f'/api/books/{book.pk}/sessions/?page_size=2')
+        self.assertEqual(ids, list(book.readingsession_set.order_by('-date', '-id').values_list('id', flat=True)))
+
+        payload = self.client.get(f'/api/books/{book.pk}/sessions/?page_size=100000').json()
+        self.assertEqual(len(payload['results']), 5)
+        self.assertIsNone(payload['next'])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get('/api/books/?cursor=nope').status_code, 404)
+        book = Book.objects.create(user=self.user, title='Libro', author='A', total_pages=10)
+        pagination = KeysetPagination()
+        for position in (['x', 'y', 'z'], [1, 2, {}], [None, 'ayer', 1], ['a', '2026-01-01T00:00:00+00:00', 'b']):
+            cursor = pagination.encode_cursor(position)
+            self.assertEqual(self.client.get(f'/api/books/?cursor={cursor}').status_code, 404, position)
+        cursor = pagination.encode_cursor(['x', 1])
+        self.assertEqual(self.client.get(f'/api/books/{book.pk}/sessions/?cursor={cursor}').status_code, 404)
+        self.assertEqual(self.client.get(f'/book/{book.pk}/sessions/?cursor={cursor}').status_code, 404)
+
+
+class DailyReadingTotalTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.book = Book.objects.create(user=self.user, title='Maestría', author='Robert Greene', total_pages=352)
+        self.other = Book.objects.create(user=self.user, title='Influencia', author='Robert Cialdini', total_pages=320)
+
+    def _totals(self):
+        return {
+            t.date: (t.minutes, t.pages, t.sessions)
+            for t in DailyReadingTotal.objects.filter(user=self.user)
+        }
+
+    def test_rollup_follows_session_writes(self):
+        d1, d2 = date(2026, 3, 1), date(2026, 3, 2)
+        first = ReadingSession.objects.create(book=self.book, end_page=30, duration_minutes=20, date=d1)
+        ReadingSession.objects.create(book=self.other, end_page=10, duration_minutes=5, date=d1)
+        ReadingSession.objects.create(book=self.book, end_page=50, duration_minutes=15, date=d2)
+        self.assertEqual(self._totals(), {
+            d1: (Decimal('25'), 40, 2),
+            d2: (Decimal('15'), 20, 1),
+        })
+
+        # Editing an earlier day changes the progress credited to later days.
+        first.end_page = 45
+        first.save()
+        self.assertEqual(self._totals()[d2], (Decimal('15'), 5, 1))
+
+        first.date = d2
+        first.save()
+        self.assertEqual(self._totals(), {
+            d1: (Decimal('5'), 10, 1),
+            d2: (Decimal('35'), 50, 2),
+        })
+
+        self.other.delete()
+        self.assertEqual(self._totals(), {d2: (Decimal('35'), 50, 2)})
+
+    def test_rebuild_command_matches_incremental(self):
+        ReadingSession.objects.bulk_create([
+            ReadingSession(book=self.book, end_page=10 * i, duration_minutes=i, date=date(2026, 3, i))
+            for i in range(1, 8)
+        ])
+        incremental = self._totals()
+        DailyReadingTotal.objects.all().delete()
+        call_command('rebuild_daily_totals', stdout=StringIO())
+        self.assertEqual(self._totals(), incremental)
+        self.assertEqual(len(incremental), 7)
+
+    def test_migration_backfills_existing_sessions(self):
+        migration = importlib.import_module('books.migrations.0004_daily_reading_total')
+        ReadingSession.objects.bulk_create([
+            ReadingSession(book=book, end_page=10 * i, duration_minutes=i, date=date(2026, 3, i % 4 + 1))
+            for book in (self.book, self.other) for i in range(1, 8)
+        ])
+        incremental = self._totals()
+        DailyReadingTotal.objects.all().delete()
+        migration.backfill_daily_totals(django_apps, None)
+        self.assertEqual(self._totals(), incremental)
+
+    def test_reading_stats_uses_rollup(self):
+        ReadingSession.objects.create(book=self.book, end_page=30, duration_minutes=90, date=timezone.localdate())
+        self.client.force_login(self.user)
+        with self.assertNumQueries(3):  # session, user, rollup
+            response = self.client.get('/estadisticas/')
+        self.assertEqual(response.context['today_display'], '1h 30m')
+
+
+class StatsServiceTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        for i, status in enumerate(['PENDING', 'READING', 'READING', 'COMPLETED']):
+            Book.objects.create(user=self.user, title=f'Libro {i}', author='A', total_pages=100, status=status)
+
+    def test_status_counts_single_query(self):
+        with self.assertNumQueries(1):
+            counts = stats.status_counts(self.user)
+        self.assertEqual(counts, {'total': 4, 'completed': 1, 'reading': 2, 'pending': 1})
+
+    def test_minutes_by_period_single_query(self):
+        today = date(2026, 3, 2)  # Monday
+        book = Book.objects.first()
+        for day, minutes in [(today, 10), (date(2026, 3, 1), 20), (date(2026, 2, 20), 40)]:
+            ReadingSession.objects.create(book=book, end_page=1, duration_minutes=minutes, date=day)
+        ranges = stats.period_ranges(today)
+        with self.assertNumQueries(1):
+            minutes = stats.minutes_by_period(self.user, ranges)
+        self.assertEqual(minutes, {
+            'today': Decimal('10'),
+            'yesterday': Decimal('20'),
+            'week': Decimal('10'),
+            'week_prev': Decimal('20'),
+            'month': Decimal('30'),
+            'month_prev': Decimal('40'),
+        })
+
+    def test_api_stats(self):
+        self.client.force_login(self.user)
+        payload = self.client.get('/api/stats/').json()
+        self.assertEqual(payload['books']['total'], 4)
+        self.assertEqual(set(payload['periods']), set(stats.PERIODS))
+
+
+class BookSearchTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        for title, author in [
+            ('Antifrágil', 'Nassim Nicholas Taleb'),
+            ('Jugar para ganar', 'Nassim Nicholas Taleb'),
+            ('Cien años de soledad', 'Gabriel García Márquez'),
+        ]:
+            Book.objects.create(user=self.user, title=title, author=author, total_pages=100)
+
+    def _titles(self, q):
+        return sorted(search.search_books(Book.objects.all(), q).values_list('title', flat=True))
+
+    def test_accent_and_case_insensitive(self):
+        self.assertEqual(self._titles('antifragil'), ['Antifrágil'])
+        self.assertEqual(self._titles('GARCIA marquez'), ['Cien años de soledad'])
+
+    def test_prefix_and_author(self):
+        self.assertEqual(self._titles('Antifr'), ['Antifrágil'])
+        self.assertEqual(self._titles('taleb'), ['Antifrágil', 'Jugar para ganar'])
+
+    def test_search_text_follows_renames(self):
+        book = Book.objects.get(title='Jugar para ganar')
+        book.title = 'Skin in the Game'
+        book.save()
+        self.assertEqual(self._titles('skin game'), ['Skin in the Game'])
+        self.assertEqual(self._titles('jugar'), [])
+
+    def test_html_and_api_search(self):
+        response = self.client.get('/?q=antifragil')
+        self.assertEqual([b.title for b in response.context['books']], ['Antifrágil'])
+        payload = self.client.get('/api/books/?q=taleb&page_size=1').json()
+        self.assertEqual(len(payload['results']), 1)
+        rest = self.client.get(payload['next']).json()
+        self.assertEqual(len(rest['results']), 1)
+        self.assertNotEqual(rest['results'][0]['id'], payload['results'][0]['id'])
+
+    def test_postgresql_query_compiles(self):
+        # The trigram lookups only exist with django.contrib.postgres installed;
+        # compile against the PostgreSQL backend so SQLite runs catch that too.
+        from django.db.backends.postgresql.base import DatabaseWrapper
+
+        pg = DatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'}, alias='pg')
+        queryset = search._search_postgresql(Book.objects.all(), 'taleb')
+        sql, params = queryset.query.get_compiler(connection=pg).as_sql()
+        self.assertIn('"books_book"."search_text" %%> %s', sql)
+        self.assertIn('WORD_SIMILARITY(%s, "books_book"."search_text")', sql)
+
+    def test_trigram_index_is_postgresql_only(self):
+        from django.db.backends.postgresql.base import DatabaseWrapper
+
+        index = next(i for i in Book._meta.indexes if i.name == 'book_search_trgm_idx')
+        pg = DatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'}, alias='pg')
+        self.assertEqual(
+            str(index.create_sql(Book, pg.schema_editor())),
+            'CREATE INDEX "book_search_trgm_idx" ON "books_book" USING gin ("search_text" gin_trgm_ops)',
+        )
+        self.assertEqual(index.create_sql(Book, connection.schema_editor()), '')
+
+
+# The opt-in setting (BOOKS_USER_CACHE=1) on the local-memory backend.
+@override_settings(
+    BOOKS_USER_CACHE=True,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'books-tests'}},
+)
+class UserCacheTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.book = Book.objects.create(user=self.user, title='Sapiens', author='Harari', total_pages=496)
+
+    def test_api_list_cached_until_write(self):
+        before = user_cache.stats()
+        self.client.get('/api/books/')
+        with self.assertNumQueries(3):  # session, user, ETag aggregate; the payload comes from the cache
+            self.assertEqual(self.client.get('/api/books/').json()['results'][0]['pages_read'], 0)
+        after = user_cache.stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ReadingSession.objects.create(book=self.book, end_page=40)
+        self.assertEqual(self.client.get('/api/books/').json()['results'][0]['pages_read'], 40)
+
+    def test_version_bumped_on_commit(self):
+        key = user_cache.make_key(self.user.pk, 'parts')
+        with self.captureOnCommitCallbacks() as callbacks:
+            ReadingSession.objects.create(book=self.book, end_page=40)
+            self.assertEqual(user_cache.make_key(self.user.pk, 'parts'), key)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(user_cache.make_key(self.user.pk, 'parts'), key)
+
+    def test_expire_user_keeps_other_entries(self):
+        other = User.objects.create_user('otro', password='x')
+        self.assertEqual(user_cache.get_or_build(self.user.pk, ('parts',), lambda: 1), 1)
+        self.assertEqual(user_cache.get_or_build(other.pk, ('parts',), lambda: 1), 1)
+        user_cache.expire_user(self.user.pk)
+        self.assertEqual(user_cache.get_or_build(self.user.pk, ('parts',), lambda: 2), 2)
+        self.assertEqual(user_cache.get_or_build(other.pk, ('parts',), lambda: 2), 1)
+
+    @override_settings(BOOKS_USER_CACHE=False)
+    def test_disabled_without_shared_cache(self):
+        before = user_cache.stats()
+        self.assertEqual(user_cache.get_or_build(self.user.pk, ('parts',), lambda: 1), 1)
+        self.assertEqual(user_cache.get_or_build(self.user.pk, ('parts',), lambda: 2), 2)
+        self.assertEqual(user_cache.stats(), before)
+
+    def test_category_rename_invalidates_every_user(self):
+        category = Category.objects.create(name='Historia')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.category = category
+            self.book.save()
+        self.assertContains(self.client.get('/'), 'Historia')
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = 'Historia universal'
+            category.save()
+        self.assertContains(self.client.get('/'), 'Historia universal')
+
+    def test_detail_history_cached_with_fresh_csrf_token(self):
+        session = ReadingSession.objects.create(book=self.book, end_page=12)
+        self.client.get(f'/book/{self.book.pk}/')
+        response = self.client.get(f'/book/{self.book.pk}/')
+        self.assertContains(response, f'/session/{session.pk}/delete/')
+        self.assertNotContains(response, '__books_csrf_token__')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            session.delete()
+        self.assertNotContains(self.client.get(f'/book/{self.book.pk}/'), f'/session/{session.pk}/delete/')
+
+    def test_cache_stats_is_staff_only(self):
+        self.assertEqual(self.client.get('/api/cache/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(set(self.client.get('/api/cache/').json()), {'hits', 'misses'})
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.book = Book.objects.create(user=self.user, title='Cero a Uno', author='Peter Thiel', total_pages=224)
+
+    def _revalidate(self, url):
+        etag = self.client.get(url).headers['ETag']
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_book_list_304_until_session_write(self):
+        etag, response = self._revalidate('/api/books/')
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('private', response.headers['Cache-Control'])
+
+        ReadingSession.objects.create(book=self.book, end_page=10)
+        self.assertEqual(self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_book_list_304_costs_one_aggregate(self):
+        etag = self.client.get('/api/books/').headers['ETag']
+        with self.assertNumQueries(3):  # session, user, aggregate
+            self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+
+    def test_sessions_and_detail(self):
+        url = f'/api/books/{self.book.pk}/sessions/'
+        etag, response = self._revalidate(url)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Last-Modified', self.client.get(f'/api/books/{self.book.pk}/').headers)
+
+        ReadingSession.objects.create(book=self.book, end_page=10)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_rename_changes_etags(self):
+        category = Category.objects.create(name='Negocios')
+        self.book.category = category
+        self.book.save()
+        etag, response = self._revalidate('/api/categories/')
+        self.assertEqual(response.status_code, 304)
+        books_etag = self.client.get('/api/books/').headers['ETag']
+
+        category.name = 'Negocios y empresa'
+        category.save()
+        self.assertEqual(self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get('/api/books/', HTTP_IF_NONE_MATCH=books_etag).status_code, 200)
+
+    def test_missing_book_is_404(self):
+        self.assertEqual(self.client.get('/api/books/999/sessions/').status_code, 404)
+        self.assertEqual(self.client.get('/api/books/abc/').status_code, 404)
+
+
+class BulkSessionImportTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.a = Book.objects.create(user=self.user, title='A', author='A', total_pages=100)
+        self.b = Book.objects.create(user=self.user, title='B', author='B', total_pages=50)
+
+    def _post(self, payload):
+        return self.client.post('/api/sessions/bulk/', payload, content_type='application/json')
+
+    def test_import_across_books(self):
+        rows = [{'book': self.a.pk, 'end_page': p, 'duration_minutes': '5', 'date': '2026-02-01'} for p in range(1, 41)]
+        rows.append({'book': self.b.pk, 'end_page': 50, 'duration_minutes': '30', 'date': '2026-02-02'})
+        response = self._post({'sessions': rows})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['created'], 41)
+        self.assertEqual(
+            {b['id']: (b['status'], b['pages_read']) for b in response.json()['books']},
+            {self.a.pk: ('READING', 40), self.b.pk: ('COMPLETED', 50)},
+        )
+        self.assertEqual(DailyReadingTotal.objects.get(user=self.user, date=date(2026, 2, 1)).sessions, 40)
+
+    def test_rejects_whole_batch_on_any_error(self):
+        other = Book.objects.create(user=User.objects.create_user('otro'), title='X', author='X', total_pages=10)
+        response = self._post([
+            {'book': self.a.pk, 'end_page': 10, 'date': '2026-02-01'},
+            {'book': self.b.pk, 'end_page': 51, 'date': '2026-02-01'},
+            {'book': other.pk, 'end_page': 1, 'date': '2026-02-01'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ReadingSession.objects.count(), 0)
+        self.assertIn('end_page', str(response.json()))
+        self.assertIn('Libro no encontrado', str(response.json()))
+
+    def test_requires_a_list(self):
+        self.assertEqual(self._post({'book': self.a.pk}).status_code, 400)
+        self.assertEqual(self._post([]).status_code, 400)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.book = Book.objects.create(user=self.user, title='Antifrágil, ed. 2', author='Taleb', total_pages=300)
+        ReadingSession.objects.bulk_create(
+            ReadingSession(book=self.book, end_page=p, duration_minutes=Decimal('1.5'), date=date(2026, 3, 1))
+            for p in range(1, 300)
+        )
+        other = Book.objects.create(user=User.objects.create_user('otro'), title='X', author='X', total_pages=9)
+        ReadingSession.objects.create(book=other, end_page=1)
+
+    def _body(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_sessions(self):
+        response = self.client.get('/api/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('booktracker-sessions-', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(self._body(response))))
+        self.assertEqual(rows[0], ['id', 'book', 'book_title', 'date', 'end_page', 'duration_minutes', 'notes'])
+        self.assertEqual(len(rows) - 1, 299)
+        self.assertEqual(rows[1][2:6], ['Antifrágil, ed. 2', '2026-03-01', '1', '1.50'])
+
+    def test_ndjson_library(self):
+        response = self.client.get('/api/export/?fmt=ndjson')
+        self.assertEqual(response.status_code, 200)
+        records = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual([r['type'] for r in records[:2]], ['book', 'session'])
+        self.assertEqual(len(records), 300)
+        self.assertEqual(records[0]['pages_read'], 299)
+
+    def test_rejects_unknown_options(self):
+        self.assertEqual(self.client.get('/api/export/?fmt=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/export/?resource=users').status_code, 400)
+
+
+class BookImportTests(TestCase):
+    GOODREADS = (
+        'Book Id,Title,Author,Number of Pages,Exclusive Shelf\n'
+        '1,Antifrágil,Nassim Nicholas Taleb,544,read\n'
+        '2,Hábitos Atómicos,James Clear,320,currently-reading\n'
+        '3,Sin páginas,Alguien,,to-read\n'
+        '4,,Sin título,100,read\n'
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        Book.objects.create(user=self.user, title='Antifragil', author='nassim nicholas taleb', total_pages=544)
+
+    def test_import_dedupes_and_reports(self):
+        report = import_books(self.user, StringIO(self.GOODREADS))
+        self.assertEqual(
+            (report['rows'], report['created'], report['duplicates'], report['error_count']), (4, 2, 1, 1)
+        )
+        self.assertEqual(report['errors'][0]['line'], 5)
+        self.assertIn('title', report['errors'][0]['errors'])
+        self.assertEqual(
+            dict(Book.objects.filter(user=self.user).values_list('title', 'status')),
+            {'Antifragil': 'PENDING', 'Hábitos Atómicos': 'READING', 'Sin páginas': 'PENDING'},
+        )
+        self.assertEqual(Book.objects.get(title='Hábitos Atómicos').search_text, 'habitos atomicos james clear')
+
+    def test_categories_resolved_in_batches(self):
+        Category.objects.create(name='Ensayo')
+        rows = ''.join(f'Libro {i},Autor,10,{"Ensayo" if i % 2 else "Novela"}\n' for i in range(10))
+        with CaptureQueriesContext(connection) as ctx:
+            report = import_books(self.user, StringIO('title,author,total_pages,category\n' + rows), batch_size=5)
+        self.assertEqual((report['created'], report['categories_created']), (10, 1))
+        self.assertEqual(Book.objects.filter(category__name='Novela').count(), 5)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+    def test_api_upload(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('goodreads.csv', self.GOODREADS.encode('utf-8-sig'), content_type='text/csv')
+        response = self.client.post('/api/books/import/', {'file': upload})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(self.client.post('/api/books/import/', {}).status_code, 400)
+
+    def test_api_rejects_malformed_csv(self):
+        self.client.force_login(self.user)
+        body = 'title,author,total_pages\n"' + 'x' * (csv.field_size_limit() + 1) + '",A,10\n'
+        upload = SimpleUploadedFile('huge.csv', body.encode(), content_type='text/csv')
+        response = self.client.post('/api/books/import/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file', response.json())
+
+    def test_long_category_names_fit_the_slug(self):
+        name = 'Historia de la filosofía occidental desde los presocráticos hasta hoy'
+        rows = f'title,author,total_pages,category\nLibro,Autor,10,{name}\nOtro,Autor,10,{name}\n'
+        report = import_books(self.user, StringIO(rows))
+        self.assertEqual((report['created'], report['categories_created']), (2, 1))
+        category = Category.objects.get()
+        self.assertEqual(len(category.slug), 50)
+        self.assertEqual(Book.objects.filter(category=category).count(), 2)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as f:
+            f.write(self.GOODREADS)
+        self.addCleanup(os.unlink, f.name)
+        out = StringIO()
+        call_command('import_books', 'lector', f.name, stdout=out, stderr=StringIO())
+        self.assertIn('Imported 2 book(s) from 4 row(s)', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+
+class SeedBooksCommandTests(TestCase):
+    def test_seeds_existing_users_with_few_queries(self):
+        for name in ('ana', 'luis', 'eva'):
+            User.objects.create_user(name)
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('seed_books', '--users', 'ana', 'luis', stdout=out)
+        self.assertLess(len(ctx.captured_queries), 20)
+        self.assertEqual(Book.objects.filter(user__username='ana').count(), 50)
+        self.assertFalse(Book.objects.filter(user__username='eva').exists())
+        self.assertEqual(Category.objects.count(), 5)
+
+        call_command('seed_books', stdout=out)
+        self.assertEqual(Book.objects.count(), 3 * 50)
+        self.assertEqual(Category.objects.count(), 5)
+
+    def test_synthetic_mode(self):
+        call_command(
+            'seed_books', '--synthetic-users', '3', '--books', '60', '--sessions', '4', '--batch-size', '50',
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.filter(username__startswith='seed-').count(), 3)
+        self.assertEqual(Book.objects.count(), 180)
+        self.assertEqual(ReadingSession.objects.count(), 720)
+        book = Book.objects.filter(user__username='seed-000001').order_by('pk').last()
+        self.assertEqual(book.max_end_page, book.readingsession_set.order_by('-end_page')[0].end_page)
+        self.assertEqual(book.status, 'COMPLETED' if book.max_end_page >= book.total_pages else 'READING')
+        self.assertEqual(
+            DailyReadingTotal.objects.filter(user=book.user).aggregate(s=models.Sum('sessions'))['s'], 240
+        )
+
+        # Re-running reuses the users and adds nothing.
+        call_command('seed_books', '--synthetic-users', '3', '--books', '60', '--sessions', '4', stdout=StringIO())
+        self.assertEqual(ReadingSession.objects.count(), 720)
+
+    def test_synthetic_mode_refreshes_only_its_users(self):
+        other = User.objects.create_user('seed-manual')
+        book = Book.objects.create(user=other, title='Libro', author='A', total_pages=100)
+        Book.objects.filter(pk=book.pk).update(max_end_page=7)
+        call_command('seed_books', '--synthetic-users', '1', '--books', '2', '--sessions', '1', stdout=StringIO())
+        self.assertEqual(Book.objects.get(pk=book.pk).max_end_page, 7)
+
+
+class BenchmarkBudgetTests(TestCase):
+    def test_query_budgets_on_smallest_dataset(self):
+        sessions = benchmarks.DATASETS[0]
+        results = benchmarks.run(sessions, repeat=2)
+        self.assertEqual(set(results), set(benchmarks.QUERY_BUDGETS))
+        # Latency and memory depend on the machine; only the query counts are asserted here.
+        self.assertEqual(benchmarks.over_budget(results, sessions, latency_budgets={}, memory_budgets={}), [])
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+        self.user = User.objects.create_user('lector', password='x')
+        self.book = Book.objects.create(user=self.user, title='Libro', author='Autor', total_pages=100)
+        self.client.force_login(self.user)
+
+    def test_records_queries_templates_and_size(self):
+        with self.assertLogs('books.metrics', 'INFO') as logs:
+            response = self.client.get(f'/book/{self.book.pk}/')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'book_detail')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(record['response_bytes'], len(response.content))
+        self.assertNotIn('n_plus_one', record)
+
+    async def test_counts_queries_of_async_requests(self):
+        # Under ASGI the ORM runs in sync_to_async threads, not on the event loop.
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs('books.metrics', 'INFO') as logs:
+            response = await self.async_client.get('/api/books/')
+        self.assertEqual(response.status_code, 200)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['db_ms'], 0)
+
+    def test_flags_repeated_statements(self):
+        def view(request):
+            for _ in range(3):
+                self.book.readingsession_set.aggregate(m=models.Max('end_page'))
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/x/')
+        with self.assertLogs('books.metrics', 'WARNING') as logs:
+            metrics.RequestMetricsMiddleware(view)(request)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['n_plus_one'][0]['count'], 3)
+        self.assertIn('MAX', record['n_plus_one'][0]['sql'].upper())
+
+    @override_settings(BOOKS_METRICS_TOKEN='s3cr3t')
+    def test_prometheus_endpoint(self):
+        self.client.get('/')
+        self.client.get('/api/books/')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cr3t')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('booktracker_requests_total{view="book_list",method="GET",status="200"} 1', body)
+        self.assertIn('booktracker_db_queries_total{view="book-list"}', body)
+        self.assertIn('booktracker_request_duration_seconds_bucket{view="book_list",le="+Inf"} 1', body)
+        self.assertIn('booktracker_cache_requests_total{result="miss"}', body)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+    def _auth_queries(self, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/stats/', **headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [q['sql'] for q in ctx.captured_queries if 'authtoken_token' in q['sql'] or 'auth_user' in q['sql']]
+
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(len(self._auth_queries(**self.auth)), 1)
+        self.assertEqual(self._auth_queries(**self.auth), [])
+
+    def test_token_deletion_evicts(self):
+        self.client.get('/api/stats/', **self.auth)
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/stats/', **self.auth).status_code, 401)
+
+    def test_deactivation_evicts(self):
+        self.client.get('/api/stats/', **self.auth)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/stats/', **self.auth).status_code, 401)
+
+    @override_settings(BOOKS_SIGNED_TOKENS=True, BOOKS_SIGNED_TOKEN_MAX_AGE=60)
+    def test_signed_tokens(self):
+        response = self.client.post('/api/auth/signed-token/', {'username': 'lector', 'password': 'x'})
+        self.assertEqual(response.status_code, 200, response.content)
+        bearer = {'HTTP_AUTHORIZATION': f'Bearer {response.json()["token"]}'}
+        self.assertEqual(len(self._auth_queries(**bearer)), 1)
+        self.assertEqual(self._auth_queries(**bearer), [])
+
+        tampered = {'HTTP_AUTHORIZATION': f'Bearer x{response.json()["token"]}'}
+        self.assertEqual(self.client.get('/api/stats/', **tampered).status_code, 401)
+        self.user.set_password('nueva')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/stats/', **bearer).status_code, 401)
+
+    @override_settings(BOOKS_SIGNED_TOKENS=True, BOOKS_SIGNED_TOKEN_MAX_AGE=-1)
+    def test_signed_token_expiry(self):
+        bearer = {'HTTP_AUTHORIZATION': f'Bearer {authentication.make_signed_token(self.user)}'}
+        response = self.client.get('/api/stats/', **bearer)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('caducado', response.json()['detail'])
+
+    def test_signed_tokens_are_opt_in(self):
+        self.assertEqual(
+            self.client.post('/api/auth/signed-token/', {'username': 'lector', 'password': 'x'}).status_code, 404
+        )
+
+
+class CleanupSessionsCommandTests(TestCase):
+    def test_deletes_only_expired_rows_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1))
+             for i in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        out = StringIO()
+        call_command('cleanup_sessions', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 5 expired session(s)', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='Ensayo')
+        for i in range(3):
+            book = Book.objects.create(
+                user=self.user, title=f'Libro {i}', author='Autor', total_pages=100, category=category
+            )
+            ReadingSession.objects.create(book=book, end_page=10 * (i + 1), duration_minutes=15)
+
+    def _book_select(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        sql = next(q['sql'] for q in ctx.captured_queries if 'FROM "books_book"' in q['sql'] and 'LIMIT' in q['sql'])
+        return response.json(), sql
+
+    def test_fields_trims_payload_and_columns(self):
+        with mock.patch.object(Book, 'total_time_read', new_callable=mock.PropertyMock) as total_time_read:
+            payload, sql = self._book_select('/api/books/?fields=id,title,pages_read&page_size=2')
+        total_time_read.assert_not_called()
+        self.assertEqual([set(row) for row in payload['results']], [{'id', 'title', 'pages_read'}] * 2)
+        self.assertIn('max_end_page', sql)
+        self.assertNotIn('total_minutes', sql)
+        self.assertNotIn('cover_url', sql)
+        rest = self.client.get(payload['next']).json()['results']
+        self.assertEqual(len(rest), 1)
+        self.assertNotIn(rest[0]['id'], [row['id'] for row in payload['results']])
+
+    def test_omit_and_compact(self):
+        payload, sql = self._book_select('/api/books/?omit=cover_url,total_time_read,category_name')
+        self.assertNotIn('total_time_read', payload['results'][0])
+        self.assertIn('progress_percentage', payload['results'][0])
+        self.assertNotIn('cover_url', sql)
+        payload, _ = self._book_select('/api/books/?compact=1')
+        self.assertEqual(set(payload['results'][0]), {'id', 'title', 'status', 'updated_at'})
+        payload, _ = self._book_select('/api/books/?compact=1&fields=id,status')
+        self.assertEqual(set(payload['results'][0]), {'id', 'status'})
+
+    def test_unknown_field_is_400(self):
+        response = self.client.get('/api/books/?fields=id,isbn')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('isbn', response.json()['fields'][0])
+
+    def test_detail_and_writes_keep_every_field(self):
+        book = Book.objects.filter(user=self.user).first()
+        self.assertEqual(set(self.client.get(f'/api/books/{book.pk}/?fields=title').json()), {'title'})
+        self.assertIn('pages_read', self.client.get(f'/api/books/{book.pk}/').json())
+        response = self.client.patch(
+            f'/api/books/{book.pk}/?fields=title', {'author': 'Otro'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pages_read', response.json())
+        book.refresh_from_db()
+        self.assertEqual((book.author, book.max_end_page), ('Otro', book.readingsession_set.get().end_page))
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Ensayo')
+        self.book = Book.objects.create(user=self.user, title='Sapiens', author='Harari', total_pages=496)
+        self.session = ReadingSession.objects.create(book=self.book, end_page=40)
+        other = User.objects.create_user('otra', password='x')
+        Book.objects.create(user=other, title='Ajeno', author='Otro', total_pages=10).delete()
+
+    def _sync(self, token=None):
+        response = self.client.get('/api/sync/', {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def _age(self, seconds):
+        # Push every existing row and tombstone out of the overlap window.
+        past = timezone.now() - timedelta(seconds=seconds)
+        for model in (Book, ReadingSession, Category):
+            model._base_manager.update(updated_at=past)
+        Tombstone.objects.update(deleted_at=past)
+
+    def test_full_then_delta(self):
+        full = self._sync()
+        self.assertTrue(full['full'])
+        self.assertEqual([b['title'] for b in full['books']], ['Sapiens'])
+        self.assertEqual([s['id'] for s in full['sessions']], [self.session.pk])
+        self.assertEqual(full['deleted'], {'books': [], 'sessions': [], 'categories': []})
+
+        self._age(60)
+        token = self._sync()['token']
+        self._age(60)
+        delta = self._sync(token)
+        self.assertEqual((delta['books'], delta['sessions'], delta['categories']), ([], [], []))
+
+        new = ReadingSession.objects.create(book=self.book, end_page=80)
+        delta = self._sync(token)
+        self.assertEqual([s['id'] for s in delta['sessions']], [new.pk])
+        self.assertEqual(delta['books'][0]['pages_read'], 80)  # counters moved with the session
+        self.assertFalse(delta['full'])
+
+    def test_deletions_come_from_tombstones(self):
+        self._age(60)
+        token = self._sync()['token']
+        self._age(60)
+        gone = self.session.pk
+        self.session.delete()
+        ReadingSession.objects.filter(book=self.book).delete()
+        category_pk = self.category.pk
+        self.category.delete()
+        delta = self._sync(token)
+        self.assertEqual(delta['deleted'], {'books': [], 'sessions': [gone], 'categories': [category_pk]})
+
+        book_pk = self.book.pk
+        Book.objects.filter(pk=book_pk).delete()
+        self.assertEqual(self._sync(token)['deleted']['books'], [book_pk])
+
+    def test_full_sync_is_paged(self):
+        for i in range(4):
+            ReadingSession.objects.create(book=self.book, end_page=50 + i)
+        page = self._sync_url('/api/sync/?page_size=2')
+        token, books, sessions, pages = page['token'], [], [], 0
+        while page:
+            self.assertEqual(page['token'], token)
+            books += [b['id'] for b in page['books']]
+            sessions += [s['id'] for s in page['sessions']]
+            page, pages = page['next'] and self._sync_url(page['next']), pages + 1
+        self.assertEqual(books, [self.book.pk])
+        self.assertEqual(sessions, list(ReadingSession.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(pages, 3)
+        self.assertEqual(self.client.get('/api/sync/', {'started': 'nope'}).status_code, 400)
+
+    def test_delta_is_paged_with_a_fixed_token(self):
+        self._age(60)
+        token = self._sync()['token']
+        self._age(60)
+        new = [ReadingSession.objects.create(book=self.book, end_page=50 + i).pk for i in range(3)]
+        gone = []
+        for i in range(3):
+            session = ReadingSession.objects.create(book=self.book, end_page=10)
+            gone.append(session.pk)
+            session.delete()
+        page = self._sync_url(f'/api/sync/?since={token}&page_size=2')
+        first, sessions, deleted, pages = page['token'], [], [], 0
+        while page:
+            self.assertEqual(page['token'], first)
+            self.assertFalse(page['full'])
+            sessions += [s['id'] for s in page['sessions']]
+            deleted += page['deleted']['sessions']
+            page, pages = page['next'] and self._sync_url(page['next']), pages + 1
+        self.assertEqual(sessions, new)
+        self.assertEqual(deleted, gone)
+        self.assertEqual(pages, 2)
+
+    def _sync_url(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_category_delete_resends_its_books(self):
+        self.book.category = self.category
+        self.book.save()
+        self._age(60)
+        token = self._sync()['token']
+        self._age(60)
+        self.category.delete()
+        delta = self._sync(token)
+        self.assertEqual([(b['id'], b['category']) for b in delta['books']], [(self.book.pk, None)])
+
+    def test_session_queryset_update_bumps_timestamp(self):
+        self._age(60)
+        token = self._sync()['token']
+        self._age(60)
+        ReadingSession.objects.filter(pk=self.session.pk).update(notes='releído')
+        self.assertEqual([s['notes'] for s in self._sync(token)['sessions']], ['releído'])
+
+    @override_settings(BOOKS_SYNC_TOMBSTONE_DAYS=1)
+    def test_bad_and_expired_tokens(self):
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'nope'}).status_code, 400)
+        old = sync.encode_token(timezone.now() - timedelta(days=2))
+        self.assertEqual(self.client.get('/api/sync/', {'since': old}).status_code, 410)
+
+        self.session.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command('prune_tombstones', stdout=out)
+        self.assertIn('Deleted 2 tombstone(s)', out.getvalue())
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class StatusEngineTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.book = Book.objects.create(user=self.user, title='Dune', author='Herbert', total_pages=100)
+
+    def _status(self, book=None):
+        return Book.objects.values_list('status', flat=True).get(pk=(book or self.book).pk)
+
+    def test_session_writes_follow_the_rule(self):
+        session = ReadingSession.objects.create(book=self.book, end_page=30)
+        self.assertEqual((self._status(), self.book.status), ('READING', 'READING'))
+        session.end_page = 100
+        session.save()
+        self.assertEqual(self._status(), 'COMPLETED')
+        ReadingSession.objects.filter(pk=session.pk).update(end_page=20)
+        self.assertEqual(self._status(), 'READING')
+        session.delete()
+        self.assertEqual(self._status(), 'PENDING')
+
+    def test_status_set_in_the_counters_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            ReadingSession.objects.create(book=self.book, end_page=100)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "books_book"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE WHEN', updates[0])
+
+    def test_views_and_bulk_import(self):
+        self.client.post(f'/book/{self.book.pk}/', {'end_page': 100, 'duration_minutes': 5, 'date': '2026-04-01'})
+        self.assertEqual(self._status(), 'COMPLETED')
+        session = self.book.readingsession_set.get()
+        self.client.post(
+            f'/session/{session.pk}/edit/', {'end_page': 10, 'duration_minutes': 5, 'date': '2026-04-01'}
+        )
+        self.assertEqual(self._status(), 'READING')
+        self.client.post(f'/session/{session.pk}/delete/')
+        self.assertEqual(self._status(), 'PENDING')
+
+        other = Book.objects.create(user=self.user, title='Emma', author='Austen', total_pages=50)
+        response = self.client.post('/api/sessions/bulk/', [
+            {'book': self.book.pk, 'end_page': 5, 'date': '2026-04-02'},
+            {'book': other.pk, 'end_page': 50, 'date': '2026-04-02'},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((self._status(), self._status(other)), ('READING', 'COMPLETED'))
+
+    def test_recompute_statuses_command(self):
+        ReadingSession.objects.create(book=self.book, end_page=100)
+        Book.objects.filter(pk=self.book.pk).update(status='PENDING', max_end_page=0)  # corrupted
+        imported = Book.objects.create(user=self.user, title='Leído', author='X', total_pages=10, status='COMPLETED')
+        before = Book.objects.get(pk=self.book.pk).updated_at
+        out = StringIO()
+        call_command('recompute_statuses', '--batch-size', '1', stdout=out)
+        self.assertIn('1 changed', out.getvalue())
+        self.assertEqual((self._status(), self._status(imported)), ('COMPLETED', 'COMPLETED'))
+        self.assertGreater(Book.objects.get(pk=self.book.pk).updated_at, before)
+
+
+class BulkDeletionTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.books = Book.objects.bulk_create(
+            Book(user=self.user, title=f'Libro {i}', author='Autor', total_pages=100) for i in range(3)
+        )
+        ReadingSession.objects.bulk_create(
+            ReadingSession(book=book, end_page=10 * (i + 1), date=date(2026, 4, 1 + i % 3))
+            for book in self.books for i in range(5)
+        )
+        self.other = User.objects.create_user('otra', password='x')
+        other_book = Book.objects.create(user=self.other, title='Ajeno', author='Otro', total_pages=10)
+        ReadingSession.objects.create(book=other_book, end_page=5, date=date(2026, 4, 1))
+
+    def test_delete_books_keeps_derived_data_consistent(self):
+        self.assertEqual(self.client.get('/api/books/').json()['results'].__len__(), 3)
+        counts = deletion.delete_books(Book.objects.filter(pk__in=[b.pk for b in self.books[:2]]), batch_size=2)
+        self.assertEqual(counts, {'books': 2, 'sessions': 10})
+        self.assertEqual(ReadingSession.objects.filter(book__user=self.user).count(), 5)
+        self.assertEqual(
+            sum(DailyReadingTotal.objects.filter(user=self.user).values_list('sessions', flat=True)), 5
+        )
+        self.assertEqual(
+            sorted(Tombstone.objects.filter(model='book').values_list('object_id', flat=True)),
+            sorted(b.pk for b in self.books[:2]),
+        )
+        self.assertEqual(len(self.client.get('/api/books/').json()['results']), 1)  # cache invalidated
+        self.assertEqual(ReadingSession.objects.filter(book__user=self.other).count(), 1)
+
+    def test_each_batch_commits_with_its_tombstones(self):
+        first, second = self.books[:2]
+        with mock.patch.object(Tombstone, 'record', side_effect=[None, RuntimeError]) as record:
+            with self.assertRaises(RuntimeError):
+                deletion.delete_books(Book.objects.filter(pk__in=[first.pk, second.pk]).order_by('pk'), batch_size=1)
+        self.assertEqual(record.call_args_list[0].args, ('book', [(self.user.pk, first.pk)]))
+        self.assertFalse(Book.objects.filter(pk=first.pk).exists())
+        self.assertTrue(Book.objects.filter(pk=second.pk).exists())  # rolled back with its tombstone
+
+        deletion.delete_books(Book.objects.filter(pk=second.pk))
+        self.assertEqual(Tombstone.objects.filter(model='book').count(), 1)
+
+    def test_sessions_deleted_without_loading_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            deletion.delete_books(Book.objects.filter(user=self.user), batch_size=4)
+        session_sql = [q['sql'] for q in ctx.captured_queries if '"books_readingsession"' in q['sql']]
+        self.assertTrue(all(not sql.startswith('SELECT "books_readingsession"."id"') for sql in session_sql))
+        # 15 sessions: 4 batches, the empty one that ends the loop and the
+        # (by then empty) cascade of the books' own DELETE.
+        self.assertEqual(sum(sql.startswith('DELETE FROM "books_readingsession"') for sql in session_sql), 6)
+
+    def test_delete_user(self):
+        token = Token.objects.create(user=self.user)
+        auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/stats/', **auth).status_code, 200)
+        counts = deletion.delete_user(self.user, batch_size=4)
+        self.assertEqual((counts['sessions'], counts['books'], counts['users']), (15, 3, 1))
+        self.assertFalse(User.objects.filter(username='lector').exists())
+        self.assertEqual(self.client.get('/api/stats/', **auth).status_code, 401)
+        self.assertEqual(ReadingSession.objects.count(), 1)
+
+    def test_view_and_api_use_the_service(self):
+        with mock.patch.object(deletion, 'delete_books', wraps=deletion.delete_books) as delete_books:
+            self.client.post(f'/book/{self.books[0].pk}/delete/')
+            self.assertEqual(self.client.delete(f'/api/books/{self.books[1].pk}/').status_code, 204)
+        self.assertEqual(delete_books.call_count, 2)
+
+        other_book = Book.objects.get(user=self.other)
+        response = self.client.post(
+            '/api/books/bulk-delete/', {'ids': [self.books[2].pk, other_book.pk]}, content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'books': 1, 'sessions': 5})
+        self.assertFalse(Book.objects.filter(user=self.user).exists())
+        self.assertTrue(Book.objects.filter(pk=other_book.pk).exists())
+        self.assertEqual(
+            self.client.post('/api/books/bulk-delete/', {'ids': 'x'}, content_type='application/json').status_code,
+            400,
+        )
+
+    def test_purge_users_command(self):
+        User.objects.create_user('seed-000001')
+        out = StringIO()
+        call_command('purge_users', 'lector', '--synthetic', '--batch-size', '3', stdout=out)
+        self.assertIn('15 sessions', out.getvalue())
+        self.assertIn('2 users', out.getvalue())
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['otra'])
+        with self.assertRaisesMessage(Exception, 'Unknown user(s): nadie'):
+            call_command('purge_users', 'nadie')
+
+
+class SessionHistoryPaginationTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('lector', password='x')
+        self.client.force_login(self.user)
+        self.book = Book.objects.create(user=self.user, title='Ulises', author='Joyce', total_pages=1000)
+        start = date(2026, 1, 1)
+        ReadingSession.objects.bulk_create(
+            ReadingSession(book=self.book, end_page=i + 1, date=start + timedelta(days=i)) for i in range(45)
+        )
+
+    @staticmethod
+    def _pages(html):
+        return [int(n) for n in re.findall(r'Hasta la página (\d+)', html)]
+
+    def _next_url(self, html):
+        match = re.search(rf'href="(/book/{self.book.pk}/sessions/\?cursor=[^"]+)"', html)
+        return match and match.group(1)
+
+    def test_detail_renders_first_page_and_stored_count(self):
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.session_count, 45)
+        html = self.client.get(f'/book/{self.book.pk}/').content.decode()
+        self.assertIn('45 sesiones', html)
+        self.assertEqual(self._pages(html), list(range(45, 25, -1)))
+        self.assertIsNotNone(self._next_url(html))
+
+    def test_partial_pages_until_the_end(self):
+        html = self.client.get(f'/book/{self.book.pk}/').content.decode()
+        seen = self._pages(html)
+        while self._next_url(html):
+            response = self.client.get(self._next_url(html))
+            self.assertEqual(response.status_code, 200)
+            html = response.content.decode()
+            self.assertNotIn('<section', html)
+            self.assertIn('csrfmiddlewaretoken', html)
+            seen += self._pages(html)
+        self.assertEqual(seen, list(range(45, 0, -1)))
+
+    def test_count_follows_writes_and_bad_cursor(self):
+        ReadingSession.objects.filter(book=self.book, end_page__lte=5).delete()
+        self.assertContains(self.client.get(f'/book/{self.book.pk}/'), '40 sesiones')
+        self.assertEqual(self.client.get(f'/book/{self.book.pk}/sessions/?cursor=nope').status_code, 404)
+        other = User.objects.create_user('otra', password='x')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(f'/book/{self.book.pk}/sessions/').status_code, 404)
+
+
+class StylesheetTests(TestCase):
+    def test_pages_link_the_built_stylesheet(self):
+        html = self.client.get('/login/').content.decode()
+        self.assertNotIn('cdn.tailwindcss.com', html)
+        self.assertNotIn('<style', html)
+        self.assertIn('href="/static/css/app.css"', html)
+
+    def test_committed_stylesheet_is_up_to_date(self):
+        # Fails after a template gains a class: run manage.py build_css.
+        call_command('build_css', '--check', stdout=StringIO(), stderr=StringIO())
+
+    def test_stylesheet_carries_the_theme(self):
+        css = (settings.BASE_DIR / 'static/css/app.css').read_text(encoding='utf-8')
+        self.assertIn('.text-ink-300{color:#8b91b8}', css)
+        self.assertIn('Inter,system-ui,sans-serif', css)
+        self.assertNotIn('/*', css.split('*/', 1)[1])  # minified; only the license banner is kept
+
+    def test_collectstatic_fingerprints_and_serves_immutable(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', '--noinput', verbosity=0)
+            html = self.client.get('/login/').content.decode()
+            url = re.search(r'href="(/static/css/app\.[0-9a-f]{12}\.css)"', html).group(1)
+            response = self.client.get(url, headers={'accept-encoding': 'gzip'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'max-age=315360000, public, immutable')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            response.close()
+
+
+class CoverHost(BaseHTTPRequestHandler):
+    """Local stand-in for the cover hosts: /cover.jpg is a 600x900 JPEG, anything else 404."""
+
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.path != '/cover.jpg':
+            self.send_error(404)
+            return
+        buffer = BytesIO()
+        Image.new('RGB', (600, 900), (200, 40, 90)).save(buffer, 'JPEG')
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(buffer.getvalue())))
+        self.end_headers()
+        self.wfile.write(buffer.getvalue())
+
+    def log_message(self, *args):
+        pass
+
+
+class CoverThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), CoverHost)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.origin = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        CoverHost.hits.clear()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings = override_settings(BOOKS_COVER_CACHE_DIR=cache_dir.name, BOOKS_COVER_ALLOW_PRIVATE_HOSTS=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user('portadas', password='x')
+        self.client.force_login(self.user)
+        self.book = Book.objects.create(
+            user=self.user, title='Libro', author='A', total_pages=100, cover_url=f'{self.origin}/cover.jpg'
+        )
+
+    def test_list_links_thumbnails_with_srcset(self):
+        html = self.client.get('/').content.decode()
+        key = covers.cover_key(self.book.cover_url)
+        self.assertNotIn(self.book.cover_url, html)
+        self.assertIn(
+            f'srcset="/book/{self.book.pk}/cover/80/?v={key} 80w, /book/{self.book.pk}/cover/160/?v={key} 160w"', html
+        )
+        self.assertIn('sizes="80px" width="80" height="112" loading="lazy"', html)
+
+    def test_cover_is_fetched_once(self):
+        key = covers.cover_key(self.book.cover_url)
+        response = self.client.get(f'/book/{self.book.pk}/cover/160/?v={key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        image = Image.open(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual((image.format, image.size), ('WEBP', (160, 224)))
+        for width in covers.WIDTHS:
+            self.assertEqual(self.client.get(f'/book/{self.book.pk}/cover/{width}/').status_code, 200)
+        self.assertEqual(CoverHost.hits, ['/cover.jpg'])
+
+    def test_parallel_srcset_requests_download_once(self):
+        fetch = covers.fetch
+
+        def slow_fetch(url):
+            time.sleep(0.2)  # long enough for every thread to reach the lock
+            return fetch(url)
+
+        paths = {}
+        with mock.patch.object(covers, 'fetch', slow_fetch):
+            threads = [
+                threading.Thread(target=lambda w=w: paths.update({w: covers.thumbnail(self.book.cover_url, w)}))
+                for w in covers.WIDTHS
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertTrue(all(paths[w] and paths[w].exists() for w in covers.WIDTHS))
+        self.assertEqual(CoverHost.hits, ['/cover.jpg'])
+
+    def test_fetch_covers_command(self):
+        Book.objects.create(user=self.user, title='Sin portada', author='A', total_pages=10)
+        Book.objects.create(user=self.user, title='Rota', author='A', total_pages=10, cover_url=f'{self.origin}/x.jpg')
+        out = StringIO()
+        call_command('fetch_covers', stdout=out)
+        self.assertIn('Fetched 1 cover(s); 1 unavailable', out.getvalue())
+        call_command('fetch_covers', stdout=StringIO())
+        self.assertEqual(sorted(CoverHost.hits), ['/cover.jpg', '/x.jpg'])
+        self.client.get(f'/book/{self.book.pk}/cover/80/')
+        self.assertEqual(len(CoverHost.hits), 2)
+
+    def test_unavailable_cover_falls_back_to_remote_url(self):
+        self.book.cover_url = f'{self.origin}/missing.jpg'
+        self.book.save()
+        for _ in range(2):
+            response = self.client.get(f'/book/{self.book.pk}/cover/80/')
+            self.assertRedirects(response, self.book.cover_url, fetch_redirect_response=False)
+        self.assertEqual(CoverHost.hits, ['/missing.jpg'])
+        self.assertEqual(self.client.get(f'/book/{self.book.pk}/cover/81/').status_code, 404)
+        self.client.force_login(User.objects.create_user('otra', password='x'))
+        self.assertEqual(self.client.get(f'/book/{self.book.pk}/cover/80/').status_code, 404)
+
+    def test_private_hosts_refused_by_default(self):
+        with override_settings(BOOKS_COVER_ALLOW_PRIVATE_HOSTS=False):
+            with self.assertRaises(covers.CoverUnavailable):
+                covers.fetch(self.book.cover_url)
+        self.assertEqual(CoverHost.hits, [])
+
+    @override_settings(BOOKS_COVER_ALLOW_PRIVATE_HOSTS=False)
+    def test_connection_uses_the_checked_address(self):
+        # One lookup: the socket connects to the address that was checked, so
+        # a second DNS answer (rebinding to 127.0.0.1) is never asked for.
+        answers = iter([[(None, None, None, '', ('93.184.216.34', 0))], [(None, None, None, '', ('127.0.0.1', 0))]])
+        lookups, connects = [], []
+
+        def getaddrinfo(host, port, *args, **kwargs):
+            lookups.append((host, port))
+            return next(answers)
+
+        def create_connection(address, *args, **kwargs):
+            connects.append(address)
+            raise ConnectionRefusedError
+
+        with mock.patch.object(covers.socket, 'getaddrinfo', getaddrinfo), \
+                mock.patch.object(covers.socket, 'create_connection', create_connection):
+            with self.assertRaises(covers.CoverUnavailable):
+                covers.fetch('https://covers.example/cover.jpg')
+        self.assertEqual((lookups, connects), ([('covers.example', 443)], [('93.184.216.34', 443)]))
 
-# Create your tests here.
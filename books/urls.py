@@ -11,6 +11,8 @@ urlpatterns = [
     path('add/', views.add_book, name='add_book'),
     path('category/add/', views.add_category, name='add_category'),
     path('book/<int:pk>/', views.book_detail, name='book_detail'),
+    path('book/<int:pk>/sessions/', views.book_session_history, name='book_session_history'),
+    path('book/<int:pk>/cover/<int:width>/', views.book_cover, name='book_cover'),
     path('book/<int:pk>/edit/', views.edit_book, name='edit_book'),
     path('book/<int:pk>/delete/', views.delete_book, name='delete_book'),
     path('session/<int:pk>/edit/', views.edit_session, name='edit_session'),
@@ -1,17 +1,24 @@
-from calendar import monthrange
-from datetime import date, timedelta
+from datetime import date
 from decimal import Decimal
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.template.loader import render_to_string
+from django.middleware.csrf import get_token
+from django.utils.safestring import mark_safe
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.contrib import messages
-from django.db import models
-from django.db.models import Q, Count, Sum
-from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.utils.cache import patch_cache_control
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from . import cache as user_cache, covers, deletion, stats
 from .models import Book, ReadingSession, Category
+from .pagination import SessionHistoryPagination
+from .search import search_books
 from .forms import BookForm, ReadingSessionForm, CategoryForm
 
 
@@ -37,17 +44,6 @@ def _format_reading_minutes(minutes):
     return f'{fmt_mins(mins)}m'
 
 
-def _sum_minutes_for_user(user, start_d, end_d):
-    total = ReadingSession.objects.filter(
-        book__user=user,
-        date__gte=start_d,
-        date__lte=end_d,
-    ).aggregate(t=Sum('duration_minutes'))['t']
-    if total is None:
-        return Decimal('0')
-    return Decimal(str(total))
-
-
 def _pct_change(current, previous):
     if previous <= 0:
         return None
@@ -111,37 +107,20 @@ def _date_range_label_es(start: date, end: date) -> str:
     return f'{start.day} {_MESES_CORTO[start.month]} {start.year} – {end.day} {_MESES_CORTO[end.month]} {end.year}'
 
 
-@login_required
-def reading_stats(request):
-    today = timezone.localdate()
-    yesterday = today - timedelta(days=1)
-
-    monday_this = today - timedelta(days=today.weekday())
-    sunday_this = monday_this + timedelta(days=6)
-    monday_prev = monday_this - timedelta(days=7)
-    sunday_prev = monday_this - timedelta(days=1)
-
-    first_this_month = today.replace(day=1)
-    _, last_day_m = monthrange(today.year, today.month)
-    last_this_month = today.replace(day=last_day_m)
-
-    if first_this_month.month == 1:
-        prev_m_year = first_this_month.year - 1
-        prev_m_month = 12
-    else:
-        prev_m_year = first_this_month.year
-        prev_m_month = first_this_month.month - 1
+_CSRF_PLACEHOLDER = '__books_csrf_token__'
 
-    first_prev_month = date(prev_m_year, prev_m_month, 1)
-    _, last_prev_m = monthrange(prev_m_year, prev_m_month)
-    last_prev_month = date(prev_m_year, prev_m_month, last_prev_m)
 
-    today_m = _sum_minutes_for_user(request.user, today, today)
-    yesterday_m = _sum_minutes_for_user(request.user, yesterday, yesterday)
-    week_m = _sum_minutes_for_user(request.user, monday_this, sunday_this)
-    week_prev_m = _sum_minutes_for_user(request.user, monday_prev, sunday_prev)
-    month_m = _sum_minutes_for_user(request.user, first_this_month, last_this_month)
-    month_prev_m = _sum_minutes_for_user(request.user, first_prev_month, last_prev_month)
+@login_required
+def reading_stats(request):
+    ranges = stats.period_ranges()
+    minutes = stats.minutes_by_period(request.user, ranges)
+    today_m, yesterday_m = minutes['today'], minutes['yesterday']
+    week_m, week_prev_m = minutes['week'], minutes['week_prev']
+    month_m, month_prev_m = minutes['month'], minutes['month_prev']
+    monday_this, sunday_this = ranges['week']
+    monday_prev, sunday_prev = ranges['week_prev']
+    first_this_month = ranges['month'][0]
+    first_prev_month = ranges['month_prev'][0]
 
     day_delta = today_m - yesterday_m
     week_delta = week_m - week_prev_m
@@ -219,30 +198,38 @@ def logout_view(request):
 def book_list(request):
     status_filter = request.GET.get('status')
     search_query = request.GET.get('q', '')
-    
-    books = Book.objects.filter(user=request.user).select_related('category').order_by('category__name', '-updated_at')
 
-    if status_filter:
-        books = books.filter(status=status_filter)
-    
-    if search_query:
-        books = books.filter(
-            Q(title__icontains=search_query) | 
-            Q(author__icontains=search_query)
+    def build():
+        books = (
+            Book.objects.filter(user=request.user)
+            .select_related('category')
+            .order_by('category__name', '-updated_at')
         )
 
-    # Calculate statistics
-    total_books = Book.objects.filter(user=request.user).count()
-    completed_books = Book.objects.filter(user=request.user, status='COMPLETED').count()
-    reading_books = Book.objects.filter(user=request.user, status='READING').count()
+        if status_filter:
+            books = books.filter(status=status_filter)
+
+        if search_query:
+            # Best matches first within each category group ({% regroup %} needs the category order).
+            books = search_books(books, search_query).order_by('category__name', '-search_rank', '-updated_at')
+
+        grid = render_to_string('books/partials/book_grid.html', {
+            'books': books,
+            'current_filter': status_filter,
+            'search_query': search_query,
+        })
+        return {'grid': grid, 'counts': stats.status_counts(request.user)}
+
+    listing = user_cache.get_or_build(request.user.pk, ('book_list', status_filter, search_query), build)
+    counts = listing['counts']
 
     context = {
-        'books': books,
+        'book_grid': listing['grid'],
         'current_filter': status_filter,
         'search_query': search_query,
-        'total_books': total_books,
-        'completed_books': completed_books,
-        'reading_books': reading_books,
+        'total_books': counts['total'],
+        'completed_books': counts['completed'],
+        'reading_books': counts['reading'],
     }
     return render(request, 'books/book_list.html', context)
 
@@ -260,6 +247,21 @@ def add_book(request):
         form = BookForm()
     return render(request, 'books/add_book.html', {'form': form})
 
+@login_required
+def book_cover(request, pk, width):
+    """Local WebP thumbnail of the book's cover (books/covers.py)."""
+    book = get_object_or_404(Book, pk=pk, user=request.user)
+    if not book.cover_url or width not in covers.WIDTHS:
+        raise Http404
+    path = covers.thumbnail(book.cover_url, width)
+    if path is None:
+        return redirect(book.cover_url)
+    response = FileResponse(path.open('rb'), content_type='image/webp')
+    # The URL carries the cover's key (?v=), so a new cover_url is a new URL.
+    if request.GET.get('v') == covers.cover_key(book.cover_url):
+        patch_cache_control(response, private=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
+
 @login_required
 def edit_book(request, pk):
     book = get_object_or_404(Book, pk=pk, user=request.user)
@@ -300,17 +302,10 @@ def book_detail(request, pk):
             if session.end_page > book.total_pages:
                 messages.error(request, f'La página no puede ser mayor al total ({book.total_pages}).')
             else:
+                # Also refreshes book's counters and status (sessions_changed).
                 session.save()
-                
-                # Update book status
-                if session.end_page >= book.total_pages:
-                    book.status = 'COMPLETED'
-                    book.save()
+                if book.status == 'COMPLETED' and session.end_page >= book.total_pages:
                     messages.success(request, '¡Felicidades! Has terminado el libro.')
-                elif book.status == 'PENDING' and session.end_page > 0:
-                    book.status = 'READING'
-                    book.save()
-                    messages.success(request, 'Progreso registrado.')
                 else:
                     messages.success(request, 'Progreso registrado.')
                 
@@ -318,20 +313,51 @@ def book_detail(request, pk):
     else:
         form = ReadingSessionForm()
 
-    sessions = book.readingsession_set.all().order_by('-date', '-id')
-    
     context = {
         'book': book,
         'form': form,
-        'sessions': sessions
+        'session_history': _session_history(request, book, 'books/partials/session_history.html'),
     }
     return render(request, 'books/book_detail.html', context)
 
+@login_required
+def book_session_history(request, pk):
+    """Older sessions of a book, as <li> rows for the book_detail history (?cursor=)."""
+    book = get_object_or_404(Book, pk=pk, user=request.user)
+    return HttpResponse(_session_history(request, book, 'books/partials/session_rows.html'))
+
+
+def _session_history(request, book, template):
+    """One keyset page of ``book``'s sessions rendered with ``template``, cached per user."""
+    cursor = request.GET.get('cursor', '')
+
+    def build():
+        paginator = SessionHistoryPagination()
+        try:
+            sessions = paginator.paginate_queryset(book.readingsession_set.all(), Request(request))
+        except NotFound:
+            raise Http404('Cursor inválido.')
+        next_cursor = paginator.next_cursor()
+        next_url = None
+        if next_cursor:
+            next_url = f"{reverse('book_session_history', args=[book.pk])}?{urlencode({'cursor': next_cursor})}"
+        # The delete forms need a CSRF token; a placeholder is cached and swapped
+        # for this request's token below.
+        return render_to_string(template, {
+            'book': book,
+            'sessions': sessions,
+            'next_url': next_url,
+            'csrf_token': _CSRF_PLACEHOLDER,
+        })
+
+    html = user_cache.get_or_build(request.user.pk, ('session_history', template, book.pk, cursor), build)
+    return mark_safe(html.replace(_CSRF_PLACEHOLDER, get_token(request)))
+
 @login_required
 def delete_book(request, pk):
     book = get_object_or_404(Book, pk=pk, user=request.user)
     if request.method == 'POST':
-        book.delete()
+        deletion.delete_books(Book.objects.filter(pk=book.pk))
         messages.success(request, 'Libro eliminado.')
         return redirect('book_list')
     return redirect('book_detail', pk=pk)
@@ -354,18 +380,6 @@ def edit_session(request, pk):
                 messages.error(request, f'La página no puede ser mayor al total ({book.total_pages}).')
             else:
                 new_session.save()
-                
-                # Recalculate book status based on the latest progress
-                max_page = book.readingsession_set.aggregate(max_page=models.Max('end_page'))['max_page'] or 0
-                
-                if max_page >= book.total_pages:
-                    book.status = 'COMPLETED'
-                elif max_page > 0:
-                    book.status = 'READING'
-                else:
-                    book.status = 'PENDING'
-                book.save()
-                
                 messages.success(request, 'Sesión actualizada.')
                 return redirect('book_detail', pk=book.pk)
     else:
@@ -386,19 +400,6 @@ def delete_session(request, pk):
     book_pk = book.pk
     if request.method == 'POST':
         session.delete()
-        
-        # Recalculate status
-        book = Book.objects.get(pk=book_pk)
-        max_page = book.readingsession_set.aggregate(max_page=models.Max('end_page'))['max_page'] or 0
-        
-        if max_page >= book.total_pages:
-            book.status = 'COMPLETED'
-        elif max_page > 0:
-            book.status = 'READING'
-        else:
-            book.status = 'PENDING'
-        book.save()
-        
         messages.success(request, 'Sesión eliminada.')
     return redirect('book_detail', pk=book_pk)
 
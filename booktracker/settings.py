@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
@@ -69,7 +71,8 @@ CORS_ALLOW_HEADERS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'books.authentication.CachedTokenAuthentication',
+        'books.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -78,9 +81,17 @@ REST_FRAMEWORK = {
     ],
 }
 
+# API auth lookups (books/authentication.py): per-process LRU of token -> user.
+BOOKS_AUTH_CACHE_SIZE = int(os.environ.get('BOOKS_AUTH_CACHE_SIZE', '1024'))
+BOOKS_AUTH_CACHE_TTL = int(os.environ.get('BOOKS_AUTH_CACHE_TTL', '60'))
+# Opt-in signed, expiring "Bearer" tokens from /api/auth/signed-token/.
+BOOKS_SIGNED_TOKENS = os.environ.get('BOOKS_SIGNED_TOKENS', '').strip().lower() in ('1', 'true', 'yes', 'on')
+BOOKS_SIGNED_TOKEN_MAX_AGE = int(os.environ.get('BOOKS_SIGNED_TOKEN_MAX_AGE', str(24 * 3600)))
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'books.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -116,10 +127,104 @@ WSGI_APPLICATION = 'booktracker.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600
+        # The Procfile serves WSGI, where persistent connections are reused. Under
+        # ASGI each request runs in its own context and does not reuse them; set
+        # DB_CONN_MAX_AGE=0 there (behind a pooler such as PgBouncer).
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '600')),
     )
 }
 
+# Cache: Redis (or any redis:// compatible server) when CACHE_URL/REDIS_URL is set,
+# per-process local memory otherwise. books/cache.py keys entries per user.
+_cache_url = (os.environ.get('CACHE_URL') or os.environ.get('REDIS_URL') or '').strip()
+if _cache_url.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': _cache_url,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'booktracker',
+        }
+    }
+
+# Web sessions: SESSION_BACKEND=db | cache | cached_db | signed_cookies. Defaults to
+# cached_db when a shared cache (Redis) is configured, db otherwise; "cache" and
+# "cached_db" on the per-process local-memory cache would lose logins between workers.
+_session_backends = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+_session_backend = os.environ.get('SESSION_BACKEND', '').strip().lower()
+if not _session_backend:
+    _session_backend = 'cached_db' if CACHES['default']['BACKEND'].endswith('RedisCache') else 'db'
+if _session_backend not in _session_backends:
+    raise ImproperlyConfigured(
+        f'SESSION_BACKEND must be one of {", ".join(_session_backends)}, not {_session_backend!r}'
+    )
+SESSION_ENGINE = _session_backends[_session_backend]
+SESSION_COOKIE_HTTPONLY = True
+
+BOOKS_CACHE_TIMEOUT = int(os.environ.get('BOOKS_CACHE_TIMEOUT', '600'))
+# books/cache.py invalidates by bumping version keys, which every worker must see:
+# on the per-process local-memory cache another worker would keep serving its
+# stale entries, so by default the per-user cache only runs with a shared (Redis)
+# cache. BOOKS_USER_CACHE=1 turns it on anyway (e.g. local memory with a single
+# worker process); BOOKS_USER_CACHE=0 turns it off.
+_user_cache = os.environ.get('BOOKS_USER_CACHE', '').strip().lower()
+if _user_cache:
+    BOOKS_USER_CACHE = _user_cache in ('1', 'true', 'yes', 'on')
+else:
+    BOOKS_USER_CACHE = CACHES['default']['BACKEND'].endswith('RedisCache')
+
+# Upper bound for POST /api/sessions/bulk/.
+BOOKS_BULK_SESSIONS_MAX = int(os.environ.get('BOOKS_BULK_SESSIONS_MAX', '5000'))
+
+# GET /api/sync/ (books/sync.py): deletions are kept this long; older sync
+# tokens get 410 and the client starts over. Prune with `manage.py prune_tombstones`.
+BOOKS_SYNC_TOMBSTONE_DAYS = int(os.environ.get('BOOKS_SYNC_TOMBSTONE_DAYS', '90'))
+
+# Cover thumbnails (books/covers.py): each Book.cover_url is downloaded once
+# and stored here as WebP thumbnails. Failed downloads are retried after
+# BOOKS_COVER_RETRY_SECONDS. Private/loopback hosts are refused unless allowed.
+BOOKS_COVER_CACHE_DIR = os.environ.get('BOOKS_COVER_CACHE_DIR', str(BASE_DIR / 'covercache'))
+BOOKS_COVER_MAX_BYTES = int(os.environ.get('BOOKS_COVER_MAX_BYTES', str(5 * 1024 * 1024)))
+BOOKS_COVER_TIMEOUT = float(os.environ.get('BOOKS_COVER_TIMEOUT', '5'))
+BOOKS_COVER_RETRY_SECONDS = int(os.environ.get('BOOKS_COVER_RETRY_SECONDS', str(24 * 3600)))
+BOOKS_COVER_ALLOW_PRIVATE_HOSTS = os.environ.get('BOOKS_COVER_ALLOW_PRIVATE_HOSTS', '').strip().lower() in (
+    '1', 'true', 'yes', 'on'
+)
+
+# Request metrics (books/metrics.py): per-view SQL/template timings in the
+# "books.metrics" log and at /metrics (Bearer BOOKS_METRICS_TOKEN or staff session).
+BOOKS_METRICS = os.environ.get('BOOKS_METRICS', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+BOOKS_METRICS_TOKEN = os.environ.get('BOOKS_METRICS_TOKEN', '').strip()
+BOOKS_METRICS_DUPLICATE_THRESHOLD = int(os.environ.get('BOOKS_METRICS_DUPLICATE_THRESHOLD', '3'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'books.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('BOOKS_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -159,13 +264,26 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# STATICFILES_STORAGE is ignored since Django 5.1; STORAGES is the setting.
+# collectstatic fingerprints and compresses static/css/app.css (built by
+# ``manage.py build_css``); WhiteNoise serves the hashed names with a
+# far-future immutable Cache-Control and everything else for
+# WHITENOISE_MAX_AGE seconds.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'booktracker.storage.StaticFilesStorage'},
+}
+WHITENOISE_MAX_AGE = int(os.environ.get('WHITENOISE_MAX_AGE', '0' if DEBUG else '3600'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# session_book_date_idx uses INCLUDE (covering) columns on PostgreSQL; SQLite
+# just builds the plain index, which is the intended fallback.
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
 # Authentication settings
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'book_list'
@@ -0,0 +1,17 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """WhiteNoise's fingerprinting, compressing storage, usable before collectstatic.
+
+    collectstatic writes css/app.<hash>.css (plus .gz/.br) and a manifest;
+    {% static %} then links the hashed name, which WhiteNoise serves with a
+    one-year ``immutable`` Cache-Control. Without a manifest (tests, a fresh
+    checkout with DEBUG off) the stock storage raises on every {% static %};
+    here the plain name is linked instead, as with DEBUG on.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
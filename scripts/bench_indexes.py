@@ -0,0 +1,148 @@
+"""
+Muestra los planes EXPLAIN y la latencia de las consultas calientes de Book y
+ReadingSession sin y con los índices compuestos de books/migrations/0005.
+
+Usa la base de datos de DATABASE_URL (usa una base de pruebas, no producción):
+
+    DATABASE_URL=postgres://localhost/booktracker_bench python scripts/bench_indexes.py
+    DATABASE_URL=sqlite:///bench.sqlite3 python scripts/bench_indexes.py --sessions 100000
+
+La primera ejecución siembra un usuario "bench-indexes" con --books libros y
+--sessions sesiones; las siguientes lo reutilizan.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booktracker.settings')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Max, Sum  # noqa: E402
+
+from books.models import Book, DailyReadingTotal, ReadingSession  # noqa: E402
+
+BENCH_USERNAME = 'bench-indexes'
+
+
+def seed(n_books, n_sessions, batch_size=5000):
+    user, created = User.objects.get_or_create(username=BENCH_USERNAME)
+    if not created and ReadingSession.objects.filter(book__user=user).count() >= n_sessions:
+        return user
+    Book.objects.filter(user=user).delete()
+
+    rng = random.Random(42)
+    statuses = ['PENDING', 'READING', 'COMPLETED']
+    books = Book.objects.bulk_create(
+        Book(user=user, title=f'Libro {i}', author=f'Autor {i % 50}', total_pages=1000, status=statuses[i % 3])
+        for i in range(n_books)
+    )
+    # _base_manager skips the per-batch counter/rollup upkeep; both are rebuilt once below.
+    start = date.today() - timedelta(days=3 * 365)
+    batch = []
+    for i in range(n_sessions):
+        batch.append(ReadingSession(
+            book=books[i % n_books],
+            end_page=rng.randint(1, 1000),
+            duration_minutes=rng.randint(5, 90),
+            date=start + timedelta(days=rng.randrange(3 * 365)),
+        ))
+        if len(batch) >= batch_size:
+            ReadingSession._base_manager.bulk_create(batch)
+            batch = []
+    if batch:
+        ReadingSession._base_manager.bulk_create(batch)
+    Book.objects.filter(user=user).refresh_progress()
+    DailyReadingTotal.objects.rebuild(user.pk, start, date.today())
+    return user
+
+
+def hot_queries(user):
+    book = Book.objects.filter(user=user).order_by('pk').first()
+    today = date.today()
+    return {
+        'libros por estado': lambda: Book.objects.filter(user=user, status='READING'),
+        'listado (category__name, -updated_at)': lambda: (
+            Book.objects.filter(user=user).order_by('category__name', '-updated_at')[:50]
+        ),
+        'historial de sesiones': lambda: (
+            ReadingSession.objects.filter(book=book).order_by('-date', '-id')[:50]
+        ),
+        'agregado por libro': lambda: (
+            ReadingSession.objects.filter(book=book)
+            .values('book')
+            .annotate(m=Max('end_page'), t=Sum('duration_minutes'))
+        ),
+        'rango de fechas por usuario': lambda: (
+            ReadingSession.objects.filter(book__user=user, date__range=(today - timedelta(days=62), today))
+            .values('date')
+            .annotate(t=Sum('duration_minutes'))
+        ),
+    }
+
+
+def measure(queries, repeat):
+    results = {}
+    for name, build in queries.items():
+        plan = build().explain()
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - t0) * 1000)
+        results[name] = (plan, statistics.median(timings))
+    return results
+
+
+def set_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for model in (Book, ReadingSession):
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=500)
+    parser.add_argument('--sessions', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    user = seed(args.books, args.sessions)
+    queries = hot_queries(user)
+
+    set_indexes(False)
+    try:
+        before = measure(queries, args.repeat)
+    finally:
+        set_indexes(True)
+    after = measure(queries, args.repeat)
+
+    print(f'{connection.vendor}: {args.books} libros, {args.sessions} sesiones, mediana de {args.repeat} ejecuciones\n')
+    for name in queries:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+        print(f'== {name}: {ms_before:.2f} ms -> {ms_after:.2f} ms')
+        print('-- sin índices:\n' + plan_before)
+        print('-- con índices:\n' + plan_after + '\n')
+
+
+if __name__ == '__main__':
+    main()
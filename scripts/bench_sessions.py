@@ -0,0 +1,86 @@
+"""
+Compara el coste por petición de cada backend de sesiones (SESSION_BACKEND):
+consultas SQL y latencia p50/p95 de las vistas HTML autenticadas, con la
+caché de páginas caliente para que la diferencia sea solo la sesión.
+
+    DATABASE_URL=sqlite:///bench.sqlite3 python scripts/bench_sessions.py
+    DATABASE_URL=postgres://localhost/booktracker_bench REDIS_URL=redis://localhost:6379/1 \\
+        python scripts/bench_sessions.py --repeat 200
+
+Con la caché en memoria local los backends "cache" y "cached_db" solo sirven
+para medir: en producción necesitan Redis compartido entre workers.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booktracker.settings')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ.setdefault('BOOKS_METRICS_LOG_LEVEL', 'WARNING')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings  # noqa: E402
+
+from books import benchmarks  # noqa: E402
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+VIEWS = ('book_list', 'book_detail', 'reading_stats')
+
+
+def measure(user, repeat):
+    client = Client()
+    client.force_login(user)
+    urls = benchmarks.endpoints(user)
+    results = {}
+    for name in VIEWS:
+        client.get(urls[name])  # fills the page cache
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(urls[name])
+        # Count now: every request_started resets the connection's query log.
+        queries = len(ctx.captured_queries)
+        session_queries = sum('django_session' in q['sql'] for q in ctx.captured_queries)
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            response = client.get(urls[name])
+            timings.append((time.perf_counter() - t0) * 1000)
+            assert response.status_code == 200, (name, response.status_code)
+        results[name] = (queries, session_queries, statistics.median(timings),
+                         statistics.quantiles(timings, n=20)[18])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=1000, help='sesiones de lectura del usuario de prueba')
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    user = benchmarks.seed(args.sessions)
+    print(f'{connection.vendor}: {args.repeat} peticiones por vista\n')
+    print(f'{"backend":<16}{"vista":<15}{"consultas":>10}{"de sesión":>11}{"p50 ms":>9}{"p95 ms":>9}')
+    for backend, engine in ENGINES.items():
+        with override_settings(SESSION_ENGINE=engine):
+            for name, (queries, session_queries, p50, p95) in measure(user, args.repeat).items():
+                print(f'{backend:<16}{name:<15}{queries:>10}{session_queries:>11}{p50:>9.2f}{p95:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
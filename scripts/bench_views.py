@@ -0,0 +1,73 @@
+"""
+Benchmark reproducible de las vistas HTML y de la API: número de consultas,
+latencia p50/p95 y memoria pico por petición, comparados con los presupuestos
+de books/benchmarks.py. Sale con código 1 si alguno se excede.
+
+Usa la base de datos de DATABASE_URL (usa una base de pruebas, no producción):
+
+    DATABASE_URL=sqlite:///bench.sqlite3 python scripts/bench_views.py
+    DATABASE_URL=postgres://localhost/booktracker_bench python scripts/bench_views.py --sessions 100000
+
+Cada tamaño de datos es un usuario "bench-views-<n>" con sesiones generadas a
+partir de una semilla fija; la primera ejecución lo siembra y las siguientes
+lo reutilizan. Por defecto cada medición empieza con la caché vacía (--warm
+mide con la caché caliente). --budgets admite un JSON con presupuestos
+propios: {"queries": {...}, "latency_ms": {"100000": {...}}, "memory_kb": {"100000": {...}}}.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booktracker.settings')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ.setdefault('BOOKS_METRICS_LOG_LEVEL', 'WARNING')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from books import benchmarks  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, nargs='+', default=list(benchmarks.DATASETS))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warm', action='store_true', help='medir con la caché caliente')
+    parser.add_argument('--budgets', type=Path, help='JSON con presupuestos propios')
+    args = parser.parse_args()
+
+    custom = json.loads(args.budgets.read_text()) if args.budgets else {}
+    call_command('migrate', verbosity=0)
+
+    problems = []
+    for sessions in args.sessions:
+        results = benchmarks.run(sessions, repeat=args.repeat, warm=args.warm)
+        print(f'\n{connection.vendor}: {sessions} sesiones, {args.repeat} ejecuciones, '
+              f'caché {"caliente" if args.warm else "fría"}')
+        print(f'{"endpoint":<16}{"consultas":>10}{"p50 ms":>10}{"p95 ms":>10}{"pico KiB":>11}')
+        for name, r in results.items():
+            print(f'{name:<16}{r["queries"]:>10}{r["p50_ms"]:>10.1f}{r["p95_ms"]:>10.1f}{r["peak_kb"]:>11.0f}')
+        problems += benchmarks.over_budget(
+            results,
+            sessions,
+            query_budgets=custom.get('queries'),
+            latency_budgets=custom.get('latency_ms', {}).get(str(sessions)),
+            memory_budgets=custom.get('memory_kb', {}).get(str(sessions)),
+        )
+
+    if problems:
+        print('\nPresupuestos excedidos:\n  ' + '\n  '.join(problems))
+        sys.exit(1)
+    print('\nTodo dentro de presupuesto.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+/*
+ * Theme and content of static/css/app.css, built by `manage.py build_css`
+ * with the standalone Tailwind CLI (pytailwindcss); assets/css/app.css
+ * loads it with @config.
+ */
+module.exports = {
+    darkMode: 'class',
+    content: [
+        './templates/**/*.html',
+        // Views that pick classes (e.g. the stats deltas' text colors).
+        './books/views.py',
+    ],
+    theme: {
+        extend: {
+            fontFamily: {
+                sans: ['Inter', 'system-ui', 'sans-serif'],
+                serif: ['Lora', 'Georgia', 'serif'],
+            },
+            colors: {
+                ink: {
+                    950: '#070914',
+                    900: '#0b1020',
+                    800: '#111733',
+                    700: '#1a2142',
+                    600: '#252d52',
+                    500: '#3b4170',
+                    400: '#5a608f',
+                    300: '#8b91b8',
+                    200: '#c2c7e0',
+                    100: '#e4e7f5',
+                },
+                brand: {
+                    50: '#eef0ff',
+                    100: '#dadffd',
+                    200: '#bcc3fb',
+                    300: '#959efa',
+                    400: '#7a82f7',
+                    500: '#6366f1',
+                    600: '#4f46e5',
+                    700: '#4338ca',
+                    800: '#3730a3',
+                    900: '#312e81',
+                },
+            },
+            boxShadow: {
+                glow: '0 0 0 1px rgba(99,102,241,0.25), 0 8px 24px -8px rgba(99,102,241,0.45)',
+                card: '0 10px 30px -12px rgba(2,6,23,0.6)',
+            },
+        },
+    },
+};